@@ -0,0 +1,152 @@
+# adaptive_detection.py
+"""Per-stream face detection that adapts to the frame rate and skips static regions
+
+    NCA_DETECTION_SCALE=0.5   start detecting at half resolution
+    NCA_TARGET_FPS=15         let the scale float to keep up with 15 fps
+    NCA_MOTION_ROI=1          only search regions that moved (plus known faces)
+"""
+import os
+import cv2
+
+DETECTION_SCALES = (1.0, 0.75, 0.5, 0.375, 0.25)
+
+
+def _union(a, b):
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def _overlaps(a, b):
+    return (a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and
+            a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+
+
+def merge_regions(regions):
+    """Union overlapping (x, y, w, h) rectangles until none overlap"""
+    regions = list(regions)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                if _overlaps(regions[i], regions[j]):
+                    regions[i] = _union(regions[i], regions.pop(j))
+                    merged = True
+                    break
+            if merged:
+                break
+    return regions
+
+
+class MotionROI:
+    """Regions of a grayscale frame that changed since the previous call
+
+    Differencing runs on a work_width-wide thumbnail. Returns None (search
+    the whole frame) on the first frame, every full_frame_interval calls and
+    when motion covers more than max_fraction of the frame.
+    """
+
+    def __init__(self, threshold=25, min_area=0.002, padding=0.25, full_frame_interval=30,
+                 max_fraction=0.6, work_width=320):
+        self.threshold = threshold
+        self.min_area = min_area  # fraction of the thumbnail
+        self.padding = padding
+        self.full_frame_interval = full_frame_interval
+        self.max_fraction = max_fraction
+        self.work_width = work_width
+        self.previous = None
+        self.calls = 0
+        self.searched_fraction = 1.0  # share of the frame the last call asked to search
+
+    def regions(self, gray, keep=()):
+        """Moving areas, padded and merged with the keep boxes (faces found last time)"""
+        frame_h, frame_w = gray.shape[:2]
+        ratio = min(1.0, self.work_width / frame_w)
+        small = cv2.GaussianBlur(cv2.resize(gray, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA),
+                                 (5, 5), 0)
+        previous, self.previous = self.previous, small
+        self.calls += 1
+        if previous is None or previous.shape != small.shape or self.calls % self.full_frame_interval == 0:
+            self.searched_fraction = 1.0
+            return None
+        _, mask = cv2.threshold(cv2.absdiff(small, previous), self.threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = self.min_area * small.shape[0] * small.shape[1]
+        boxes = [tuple(int(v / ratio) for v in cv2.boundingRect(contour))
+                 for contour in contours if cv2.contourArea(contour) >= min_area]
+        regions = []
+        for x, y, w, h in boxes + list(keep):
+            px, py = int(w * self.padding), int(h * self.padding)
+            x0, y0 = max(0, x - px), max(0, y - py)
+            x1, y1 = min(frame_w, x + w + px), min(frame_h, y + h + py)
+            regions.append((x0, y0, x1 - x0, y1 - y0))
+        regions = merge_regions(regions)
+        self.searched_fraction = sum(w * h for _, _, w, h in regions) / (frame_w * frame_h)
+        if self.searched_fraction > self.max_fraction:
+            self.searched_fraction = 1.0
+            return None
+        return regions
+
+
+class ScaleTuner:
+    """Step the detection scale down while frames miss target_fps, back up when there is headroom"""
+
+    def __init__(self, target_fps, scales=DETECTION_SCALES, initial=1.0, window=30, headroom=1.5):
+        self.target_fps = target_fps
+        self.scales = sorted(scales, reverse=True)
+        self.position = min(range(len(self.scales)), key=lambda i: abs(self.scales[i] - initial))
+        self.window = window
+        self.headroom = headroom
+        self.frame_seconds = []
+
+    @property
+    def scale(self):
+        return self.scales[self.position]
+
+    def update(self, seconds):
+        """Record one frame's processing time and return the scale to use next"""
+        self.frame_seconds.append(seconds)
+        if len(self.frame_seconds) >= self.window:
+            fps = len(self.frame_seconds) / max(sum(self.frame_seconds), 1e-9)
+            if fps < self.target_fps and self.position < len(self.scales) - 1:
+                self.position += 1
+            elif fps > self.target_fps * self.headroom and self.position > 0:
+                self.position -= 1
+            self.frame_seconds = []
+        return self.scale
+
+
+class AdaptiveDetector:
+    """Face detection state for one video stream (motion history, tuned scale)"""
+
+    def __init__(self, emotion_detector, scale=None, target_fps=None, motion_roi=False):
+        self.emotion_detector = emotion_detector
+        scale = scale or emotion_detector.detection_scale
+        self.tuner = ScaleTuner(target_fps, initial=scale) if target_fps else None
+        self.scale = self.tuner.scale if self.tuner else scale
+        self.motion = MotionROI() if motion_roi else None
+        self.last_boxes = []
+
+    @classmethod
+    def from_env(cls, emotion_detector):
+        """Configure from NCA_DETECTION_SCALE, NCA_TARGET_FPS and NCA_MOTION_ROI"""
+        target_fps = os.environ.get("NCA_TARGET_FPS")
+        return cls(emotion_detector, target_fps=float(target_fps) if target_fps else None,
+                   motion_roi=os.environ.get("NCA_MOTION_ROI", "0") not in ("", "0"))
+
+    def detect(self, gray):
+        """(x, y, w, h) face boxes in frame pixels"""
+        regions = self.motion.regions(gray, self.last_boxes) if self.motion else None
+        self.last_boxes = self.emotion_detector.detect_faces(gray, self.scale, regions)
+        return self.last_boxes
+
+    def frame_done(self, seconds):
+        """Feed one frame's total processing time to the auto-tuner"""
+        if self.tuner:
+            self.scale = self.tuner.update(seconds)
+
+    def stats(self):
+        return {"scale": self.scale,
+                "searched_fraction": self.motion.searched_fraction if self.motion else 1.0}
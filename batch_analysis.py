@@ -0,0 +1,201 @@
+# batch_analysis.py
+"""Headless recognition and emotion analysis of recorded video files
+
+    python batch_analysis.py footage/*.mp4 --frame-skip 5 --workers 8
+
+Each file is cut into segments that are analysed in parallel by a pool
+of worker processes, each holding its own models. Recognized faces are
+written to emotion_logs in bulk and a JSON summary is saved per file,
+at the file's path relative to the common directory of all inputs.
+Without --start-time a recording is assumed to have ended at its file
+modification time. Files that do not report a frame count are read to
+the end as a single segment.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter, defaultdict
+import cv2
+
+_analyzer = None  # per-worker FrameAnalyzer
+
+
+def _init_worker(service_url=None, detection_scale=1.0):
+    """Load the models once per worker process, or connect to a running service"""
+    global _analyzer
+    if service_url:
+        from recognition_service import RecognitionClient
+        _analyzer = RecognitionClient(service_url)
+        return
+    import database
+    from encoding_snapshot import DEFAULT_SNAPSHOT_PATH
+    from face_recognition_module import FaceRecognizer
+    from emotion_detection import EmotionDetector
+    from frame_analysis import FrameAnalyzer
+    recognizer = FaceRecognizer(database, snapshot_path=DEFAULT_SNAPSHOT_PATH)
+    _analyzer = FrameAnalyzer(recognizer, EmotionDetector(detection_scale=detection_scale))
+
+
+def plan_segments(path, segment_seconds, start_ms=None):
+    """Split a video into (path, first_frame, end_frame, fps, start_ms) work items
+
+    end_frame is None for a file without a usable frame count, and start_ms
+    None when the start can only be worked out once its length is known.
+    """
+    cap = cv2.VideoCapture(path)
+    opened = cap.isOpened()
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if not opened:
+        print(f"{path}: could not open, skipping")
+        return []
+    if frame_count <= 0:
+        print(f"{path}: frame count unknown, reading it as one segment")
+        return [(path, 0, None, fps, start_ms)]
+    if start_ms is None:
+        # The modification time is when the recorder stopped writing
+        start_ms = int(os.path.getmtime(path) * 1000 - frame_count * 1000 / fps)
+    segment_frames = max(1, int(segment_seconds * fps))
+    return [(path, first, min(first + segment_frames, frame_count), fps, start_ms)
+            for first in range(0, frame_count, segment_frames)]
+
+
+def analyze_segment(task):
+    """Worker: analyse every frame_skip-th frame of one segment (to the end of the file if end_frame is None)"""
+    (path, first_frame, end_frame, fps, start_ms), frame_skip = task
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+    rows, unknown_faces, analyzed = [], 0, 0
+    frame_number = first_frame
+    while end_frame is None or frame_number < end_frame:
+        if (frame_number - first_frame) % frame_skip:
+            if not cap.grab():  # skip without decoding
+                break
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            analyzed += 1
+            offset_ms = int(frame_number * 1000 / fps)
+            for face in _analyzer.analyze(frame):
+                if face.identity == "Unknown":
+                    unknown_faces += 1
+                else:
+                    rows.append((face.identity, offset_ms, face.emotion))
+        frame_number += 1
+    cap.release()
+    if start_ms is None:  # length only known now; the file ended at its modification time
+        start_ms = int(os.path.getmtime(path) * 1000 - frame_number * 1000 / fps)
+    rows = [(criminal_id, start_ms + offset_ms, emotion) for criminal_id, offset_ms, emotion in rows]
+    return path, frame_number - first_frame, analyzed, unknown_faces, rows
+
+
+def summarize(path, fps, stats, rows, elapsed):
+    """Per-file summary: frame counts, speed and emotions per recognized identity"""
+    emotions = defaultdict(Counter)
+    seen = {}
+    for criminal_id, timestamp, emotion in rows:
+        emotions[criminal_id][emotion] += 1
+        first, last = seen.get(criminal_id, (timestamp, timestamp))
+        seen[criminal_id] = (min(first, timestamp), max(last, timestamp))
+    video_seconds = stats["frames"] / fps if fps else 0
+    return {
+        "file": path,
+        "video_seconds": round(video_seconds, 1),
+        "frames": stats["frames"],
+        "frames_analyzed": stats["analyzed"],
+        "recognized_faces": len(rows),
+        "unknown_faces": stats["unknown"],
+        "processing_seconds": round(elapsed, 1),
+        "speed_vs_realtime": round(video_seconds / elapsed, 1) if elapsed else None,
+        "identities": {criminal_id: {"emotions": dict(counts),
+                                     "first_seen_ms": seen[criminal_id][0],
+                                     "last_seen_ms": seen[criminal_id][1]}
+                       for criminal_id, counts in emotions.items()},
+    }
+
+
+def summary_names(paths):
+    """Summary file name per video: its path relative to the inputs' common directory"""
+    directories = [os.path.dirname(os.path.abspath(path)) for path in paths]
+    try:
+        root = os.path.commonpath(directories) if directories else ""
+    except ValueError:  # different drives
+        root = ""
+    names = {}
+    for path in paths:
+        absolute = os.path.abspath(path)
+        relative = os.path.relpath(absolute, root) if root else os.path.splitdrive(absolute)[1].lstrip(os.sep)
+        names[path] = relative + ".summary.json"
+    return names
+
+
+def analyze_videos(paths, frame_skip=1, workers=None, segment_seconds=300, summary_dir=None, start_ms=None,
+                   service_url=None, detection_scale=1.0):
+    """Analyse video files in parallel and return their summaries"""
+    import database
+
+    tasks, fps_by_file = [], {}
+    for path in paths:
+        segments = plan_segments(path, segment_seconds, start_ms)
+        if segments:
+            fps_by_file[path] = segments[0][3]
+        tasks += [(segment, frame_skip) for segment in segments]
+    remaining = Counter(segment[0] for segment, _ in tasks)
+    names = summary_names(paths)
+    stats = {path: {"frames": 0, "analyzed": 0, "unknown": 0} for path in paths}
+    file_rows = defaultdict(list)
+    summaries = []
+    start = time.perf_counter()
+
+    # spawn: TensorFlow and dlib are not fork-safe
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker,
+                                                   initargs=(service_url, detection_scale)) as pool:
+        for path, frames, analyzed, unknown, rows in pool.imap_unordered(analyze_segment, tasks):
+            database.log_emotions_bulk(rows)
+            file_stats = stats[path]
+            file_stats["frames"] += frames
+            file_stats["analyzed"] += analyzed
+            file_stats["unknown"] += unknown
+            file_rows[path] += rows
+            remaining[path] -= 1
+            if remaining[path] == 0:
+                summary = summarize(path, fps_by_file[path], file_stats, file_rows.pop(path),
+                                    time.perf_counter() - start)
+                summaries.append(summary)
+                if summary_dir:
+                    summary_path = os.path.join(summary_dir, names[path])
+                    os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+                    with open(summary_path, "w") as file:
+                        json.dump(summary, file, indent=2)
+                print(f"{path}: {summary['frames_analyzed']} frames analysed, "
+                      f"{summary['recognized_faces']} recognized faces, "
+                      f"{summary['speed_vs_realtime']}x real time", flush=True)
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse recorded video files without the GUI")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--frame-skip", type=int, default=1, help="analyse every Nth frame")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--segment-seconds", type=float, default=300, help="video length per work item")
+    parser.add_argument("--summary-dir", default="analysis_summaries")
+    parser.add_argument("--start-time", type=float, default=None,
+                        help="recording start as a Unix timestamp "
+                             "(default: file modification time minus the video length)")
+    parser.add_argument("--service", help="send frames to a recognition_service.py URL instead of loading models")
+    parser.add_argument("--detection-scale", type=float, default=1.0,
+                        help="detect faces on frames downscaled by this factor (e.g. 0.5 for 1080p)")
+    args = parser.parse_args()
+
+    start_ms = int(args.start_time * 1000) if args.start_time is not None else None
+    analyze_videos(args.videos, max(1, args.frame_skip), args.workers, args.segment_seconds,
+                   args.summary_dir, start_ms, args.service, args.detection_scale)
+
+
+if __name__ == "__main__":
+    main()
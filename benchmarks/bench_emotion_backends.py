@@ -0,0 +1,66 @@
+# benchmarks/bench_emotion_backends.py
+"""Per-face latency and memory of the Keras and TFLite emotion backends
+
+Each backend runs in its own interpreter so peak RSS reflects only what
+that backend imports and allocates.
+
+    python export_emotion_model.py
+    python benchmarks/bench_emotion_backends.py --backends keras tflite
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, resource, sys, time
+import numpy as np
+sys.path.insert(0, {root!r})
+from emotion_detection import load_emotion_model
+start = time.perf_counter()
+model = load_emotion_model({backend!r}, {model_path!r})
+load_seconds = time.perf_counter() - start
+per_face_ms = {{}}
+for batch_size in {batch_sizes!r}:
+    batch = np.random.default_rng(0).random((batch_size, 48, 48, 1), dtype=np.float32)
+    model(batch, training=False)  # warm up
+    start = time.perf_counter()
+    for _ in range({iterations}):
+        np.asarray(model(batch, training=False))
+    per_face_ms[batch_size] = (time.perf_counter() - start) * 1000 / ({iterations} * batch_size)
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"load_seconds": load_seconds, "per_face_ms": per_face_ms,
+                  "peak_rss_mb": rss_kb / 1024 if sys.platform != "darwin" else rss_kb / 2**20}}))
+"""
+
+
+def run_backend(backend, model_path, batch_sizes, iterations):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, NCA_DB_PATH=os.path.join(tmp, "bench.db"))
+        code = PROBE.format(root=ROOT, backend=backend, model_path=model_path,
+                            batch_sizes=batch_sizes, iterations=iterations)
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["keras", "tflite"])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        result = run_backend(backend, None, args.batch_sizes, args.iterations)
+        latencies = "  ".join(f"b{size}: {ms:.2f} ms/face" for size, ms in result["per_face_ms"].items())
+        print(f"{backend:7s} load {result['load_seconds']:.2f}s  peak RSS {result['peak_rss_mb']:.0f} MB  "
+              f"{latencies}")
+
+
+if __name__ == "__main__":
+    main()
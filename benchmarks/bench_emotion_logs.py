@@ -0,0 +1,94 @@
+# benchmarks/bench_emotion_logs.py
+"""Query latency of get_emotion_logs on a large emotion_logs table
+
+Compares the migrated schema (integer epoch-ms timestamps with a
+(criminal_id, timestamp) index) against the pre-migration layout (text
+timestamps, no index) on the same synthetic data.
+
+    python benchmarks/bench_emotion_logs.py                 # 10M rows per table, about 4 minutes
+    python benchmarks/bench_emotion_logs.py --rows 300000   # quick check
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def generate_rows(count, criminals, start_ms, text_timestamps):
+    """Yield (criminal_id, timestamp, emotion), one row per ~33 ms frame"""
+    emotions = ['Angry', 'Disgust', 'Fear', 'Happy', 'Sad', 'Surprise', 'Neutral']
+    rng = random.Random(0)
+    for i in range(count):
+        ts = start_ms + i * 33
+        if text_timestamps:
+            ts = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts / 1000))
+        yield (f"C{rng.randrange(criminals):06d}", ts, emotions[rng.randrange(len(emotions))])
+
+
+def fill(conn, table, rows, chunk=200_000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == chunk:
+            conn.executemany(f"INSERT INTO {table} (criminal_id, timestamp, emotion) VALUES (?, ?, ?)", batch)
+            conn.commit()
+            batch = []
+    if batch:
+        conn.executemany(f"INSERT INTO {table} (criminal_id, timestamp, emotion) VALUES (?, ?, ?)", batch)
+        conn.commit()
+
+
+def time_queries(fn, criminal_ids):
+    latencies = []
+    for criminal_id in criminal_ids:
+        start = time.perf_counter()
+        fn(criminal_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--criminals", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["NCA_DB_PATH"] = os.path.join(tmp, "bench.db")
+        import database  # creates the migrated schema in the temp database
+
+        conn = database.get_db_connection()
+        conn.execute("""CREATE TABLE emotion_logs_legacy (
+                     id INTEGER PRIMARY KEY, criminal_id TEXT, timestamp TEXT, emotion TEXT)""")
+        start_ms = int(time.time() * 1000) - args.rows * 33
+
+        print(f"Loading {args.rows:,} rows into each table...")
+        load_start = time.perf_counter()
+        fill(conn, "emotion_logs", generate_rows(args.rows, args.criminals, start_ms, False))
+        fill(conn, "emotion_logs_legacy", generate_rows(args.rows, args.criminals, start_ms, True))
+        print(f"Loaded in {time.perf_counter() - load_start:.1f}s")
+
+        rng = random.Random(1)
+        criminal_ids = [f"C{rng.randrange(args.criminals):06d}" for _ in range(args.queries)]
+
+        def legacy_query(criminal_id):
+            conn.execute("""SELECT timestamp, emotion FROM emotion_logs_legacy
+                         WHERE criminal_id=? ORDER BY timestamp""", (criminal_id,)).fetchall()
+
+        for name, fn in [("indexed, epoch ms", database.get_emotion_logs),
+                         ("legacy, no index", legacy_query)]:
+            median, p95 = time_queries(fn, criminal_ids)
+            print(f"{name:20s} median {median:8.2f} ms   p95 {p95:8.2f} ms")
+        database.close_emotion_log_writer()
+        database.close_db_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_startup.py
+"""Guard application startup time
+
+Imports the modules needed to show the login window and the main window
+in a fresh interpreter, reports how long each took, and fails if it is
+over budget or if a heavy library (TensorFlow, dlib, face_recognition,
+matplotlib) was pulled in before it is actually needed.
+
+    python benchmarks/bench_startup.py --budget 1.5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["tensorflow", "keras", "dlib", "face_recognition", "matplotlib"]
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+timings = {{}}
+for module in ["main", "gui"]:
+    start = time.perf_counter()
+    __import__(module)
+    timings[module] = time.perf_counter() - start
+print(json.dumps({{"timings": timings,
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(runs):
+    """Best-of-N import timings from fresh interpreters"""
+    best, heavy = {}, set()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, NCA_DB_PATH=os.path.join(tmp, "startup.db"))
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, "-c", PROBE.format(root=ROOT, heavy=HEAVY_MODULES)],
+                                    cwd=tmp, env=env, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            for module, seconds in result["timings"].items():
+                best[module] = min(seconds, best.get(module, seconds))
+            heavy.update(result["heavy"])
+    return best, sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.5, help="max seconds to import main + gui")
+    args = parser.parse_args()
+
+    timings, heavy = measure(args.runs)
+    for module, seconds in timings.items():
+        print(f"import {module:5s} {seconds * 1000:8.1f} ms")
+    total = sum(timings.values())
+    failures = []
+    if total > args.budget:
+        failures.append(f"startup imports took {total:.2f}s, budget {args.budget:.2f}s")
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"OK: {total * 1000:.0f} ms total, no heavy modules loaded")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
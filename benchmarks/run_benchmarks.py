@@ -0,0 +1,337 @@
+# benchmarks/run_benchmarks.py
+"""Offline CPU benchmarks of the recognition and emotion hot paths
+
+    python benchmarks/run_benchmarks.py                              # all suites
+    python benchmarks/run_benchmarks.py --suites matching database --sizes 1000 100000
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/previous.json --threshold 0.15
+
+Suites:
+    matching   FaceRecognizer.identify against synthetic 1k/100k/1M watchlists (exact and IVF)
+    emotion    EmotionDetector.classify_faces per-face latency over a batch-size sweep
+    database   log_emotion write rate and get_emotion_logs/get_emotion_counts latency in a temp DB
+    e2e        frames per second over a sample video (generated on first run if --video is not given)
+
+Results are written as JSON (one flat metric -> value map plus machine
+details). With --baseline every shared metric is compared and the run
+fails if any got worse by more than --threshold or was not measured.
+Suites whose Python dependencies are missing (TensorFlow, dlib) are
+recorded as skipped; any other error, including a missing emotion model
+file, fails the run.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SAMPLE_VIDEO = os.path.join(DATA_DIR, "sample_faces.avi")
+
+
+class SyntheticWatchlist:
+    """Stands in for the database module as FaceRecognizer's encoding source"""
+
+    def __init__(self, size, seed=0):
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        # dlib encodings have roughly unit norm; spread entries the same way
+        self.encodings = rng.standard_normal((size, 128), dtype=np.float32) / np.sqrt(128)
+        self.ids = [f"C{i:07d}" for i in range(size)]
+
+    def load_criminal_encodings(self):
+        return self.ids, self.encodings
+
+    def queries(self, count, seed=1):
+        """Half noisy copies of watchlist entries (hits), half unseen faces (misses)"""
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        hits = self.encodings[rng.choice(len(self.ids), count // 2)]
+        hits = hits + rng.standard_normal(hits.shape, dtype=np.float32) * 0.02
+        misses = rng.standard_normal((count - count // 2, 128), dtype=np.float32) / np.sqrt(128)
+        return np.vstack([hits, misses])
+
+    def hits(self, count, seed=2):
+        """Noisy copies of watchlist entries, every one with a true match"""
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        hits = self.encodings[rng.choice(len(self.ids), count)]
+        return hits + rng.standard_normal(hits.shape, dtype=np.float32) * 0.02
+
+
+def _best_of(fn, repeats):
+    """Fastest of several timed calls, in seconds"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_matching(sizes, batch=32, repeats=5):
+    from face_recognition_module import FaceRecognizer
+    from watchlist_index import create_index, recall_at_k
+
+    results = {}
+    for size in sizes:
+        watchlist = SyntheticWatchlist(size)
+        queries = watchlist.queries(batch)
+        for kind in ("exact", "ivf"):
+            start = time.perf_counter()
+            recognizer = FaceRecognizer(watchlist, index=kind)
+            prefix = f"matching.{kind}.{size}"
+            results[f"{prefix}.build_s"] = time.perf_counter() - start
+            batch_seconds = _best_of(lambda: recognizer.identify(queries), repeats)
+            single_seconds = _best_of(lambda: recognizer.identify(queries[:1]), repeats)
+            results[f"{prefix}.batch_us_per_face"] = 1e6 * batch_seconds / batch
+            results[f"{prefix}.single_face_ms"] = 1000 * single_seconds
+            if kind == "ivf":
+                exact = create_index("exact")
+                exact.build(watchlist.ids, watchlist.encodings)
+                # Misses have no true neighbour worth finding, so recall counts hits only
+                results[f"{prefix}.recall_at_1"] = recall_at_k(recognizer.index, exact, watchlist.hits(200), k=1)
+            print(f"  {prefix}: {results[f'{prefix}.batch_us_per_face']:.1f} us/face batched, "
+                  f"{results[f'{prefix}.single_face_ms']:.2f} ms single", flush=True)
+            del recognizer
+    return results
+
+
+def bench_emotion(backend, batch_sizes, iterations=20):
+    import numpy as np
+    from emotion_detection import EmotionDetector
+
+    backend_name = backend or os.environ.get("NCA_EMOTION_BACKEND", "keras")
+    detector = EmotionDetector(backend=backend)
+    detector.warm_up()
+    rng = np.random.default_rng(0)
+    results = {}
+    for size in batch_sizes:
+        batch = rng.random((size, 48, 48, 1), dtype=np.float32)
+        detector.classify_faces(batch)  # first call at a new shape may retrace or reallocate
+        seconds = _best_of(lambda: detector.classify_faces(batch), iterations)
+        results[f"emotion.{backend_name}.batch{size}.ms_per_face"] = 1000 * seconds / size
+        print(f"  batch {size:4d}: {1000 * seconds / size:.3f} ms/face", flush=True)
+    return results
+
+
+def bench_database(rows, criminals=100, repeats=5):
+    import database
+
+    ids = [f"C{i:06d}" for i in range(criminals)]
+    emotions = ['Angry', 'Disgust', 'Fear', 'Happy', 'Sad', 'Surprise', 'Neutral']
+    start = time.perf_counter()
+    for i in range(rows):
+        database.log_emotion(ids[i % criminals], emotions[i % len(emotions)])
+    queued = time.perf_counter() - start
+    database.flush_emotion_logs()
+    written = time.perf_counter() - start
+    target = ids[0]
+    logs = []
+    read_seconds = _best_of(lambda: logs.append(database.get_emotion_logs(target)), repeats)
+    counts_seconds = _best_of(lambda: database.get_emotion_counts(target), repeats)
+    results = {
+        "database.log_emotion.queue_us_per_row": 1e6 * queued / rows,
+        "database.log_emotion.rows_per_s": rows / written,
+        "database.get_emotion_logs.ms": 1000 * read_seconds,
+        "database.get_emotion_counts.ms": 1000 * counts_seconds,
+    }
+    print(f"  {rows} rows: {rows / written:,.0f} rows/s written, get_emotion_logs "
+          f"({len(logs[-1])} rows) {1000 * read_seconds:.1f} ms, get_emotion_counts "
+          f"{1000 * counts_seconds:.2f} ms", flush=True)
+    return results
+
+
+def draw_face(frame, cx, cy, scale=1.0):
+    """Schematic frontal face the Haar cascade detects: skin, hair, brows, eyes, nose and mouth"""
+    import cv2
+
+    def at(x, y):
+        return (int(cx + x * scale), int(cy + y * scale))
+
+    def size(w, h):
+        return (int(w * scale), int(h * scale))
+
+    cv2.ellipse(frame, at(0, 0), size(62, 82), 0, 0, 360, (120, 150, 190), -1)
+    cv2.ellipse(frame, at(0, -70), size(66, 40), 0, 180, 360, (30, 40, 60), -1)
+    for side in (-1, 1):
+        cv2.ellipse(frame, at(side * 25, -30), size(18, 5), 0, 0, 360, (40, 50, 70), -1)
+        cv2.ellipse(frame, at(side * 25, -14), size(14, 7), 0, 0, 360, (70, 85, 110), -1)
+        cv2.circle(frame, at(side * 25, -14), int(5 * scale), (20, 20, 30), -1)
+    cv2.line(frame, at(0, -10), at(-5, 22), (95, 120, 160), max(1, int(3 * scale)))
+    cv2.ellipse(frame, at(0, 24), size(10, 5), 0, 0, 360, (90, 110, 150), -1)
+    cv2.ellipse(frame, at(0, 46), size(24, 7), 0, 0, 360, (60, 60, 130), -1)
+
+
+def make_sample_video(path, frames=300, size=(640, 480), fps=25):
+    """Deterministic synthetic clip: two moving, detectable faces over a textured background"""
+    import cv2
+    import numpy as np
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8), (0, 0), 3)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        frame = background.copy()
+        for j, (cx, cy, scale) in enumerate([(160, 250, 1.0), (470, 230, 1.3)]):
+            draw_face(frame, int(cx + 50 * np.sin((i + 40 * j) / 20)), cy, scale)
+        writer.write(cv2.GaussianBlur(frame, (0, 0), 2))
+    writer.release()
+
+
+def bench_e2e(video, backend, watchlist_size=1000):
+    import cv2
+    from face_recognition_module import FaceRecognizer
+    from emotion_detection import EmotionDetector
+    from frame_analysis import FrameAnalyzer
+    from face_tracking import FaceTracker
+
+    if video is None:
+        video = SAMPLE_VIDEO
+        if not os.path.exists(video):
+            make_sample_video(video)
+    recognizer = FaceRecognizer(SyntheticWatchlist(watchlist_size))
+    emotion_detector = EmotionDetector(backend=backend)
+    emotion_detector.warm_up()
+    results = {}
+    for mode in ("analyze", "tracker"):
+        analyzer = FrameAnalyzer(recognizer, emotion_detector)
+        process = FaceTracker(analyzer).process if mode == "tracker" else analyzer.analyze
+        capture = cv2.VideoCapture(video)
+        frames = faces = 0
+        start = time.perf_counter()
+        while True:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            faces += len(process(frame))
+            frames += 1
+        elapsed = time.perf_counter() - start
+        capture.release()
+        if not frames:
+            raise RuntimeError(f"could not read frames from {video}")
+        if not faces:
+            raise RuntimeError(f"no faces detected in {video}, fps would not cover recognition")
+        results[f"e2e.{mode}.faces_per_frame"] = faces / frames
+        results[f"e2e.{mode}.fps"] = frames / elapsed
+        print(f"  {mode}: {frames / elapsed:.1f} fps over {frames} frames ({faces} faces)", flush=True)
+    return results
+
+
+# Which direction is better for each metric suffix; anything else is informational
+LOWER_IS_BETTER = ("_s", "_us_per_face", "_ms", "_ms_per_face", "_us_per_row")
+HIGHER_IS_BETTER = ("fps", "rows_per_s", "recall_at_1")
+
+
+def direction(metric):
+    if metric.endswith(HIGHER_IS_BETTER):
+        return "higher"
+    if metric.endswith(LOWER_IS_BETTER):
+        return "lower"
+    return None
+
+
+def compare(results, baseline, threshold, suites=None):
+    """Return (metric, old, new, change) for every metric that got worse by more than threshold
+
+    Baseline metrics of the given suites that this run did not produce are
+    returned with new and change set to None.
+    """
+    regressions = []
+    for metric, old in baseline.items():
+        if metric not in results and (suites is None or metric.split(".")[0] in suites):
+            regressions.append((metric, old, None, None))
+    for metric, new in results.items():
+        old = baseline.get(metric)
+        better = direction(metric)
+        if old is None or better is None or not old:
+            continue
+        change = (new - old) / old
+        if (better == "lower" and change > threshold) or (better == "higher" and change < -threshold):
+            regressions.append((metric, old, new, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suites", nargs="+", default=["matching", "emotion", "database", "e2e"],
+                        choices=["matching", "emotion", "database", "e2e"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="watchlist sizes for the matching suite")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--backend", choices=["keras", "tflite"], default=None,
+                        help="emotion backend (default: NCA_EMOTION_BACKEND or keras)")
+    parser.add_argument("--rows", type=int, default=200000, help="emotion log rows for the database suite")
+    parser.add_argument("--video", help="video for the e2e suite (default: generated sample)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    # Never touch the real database
+    tmp = tempfile.mkdtemp(prefix="nca-bench-")
+    os.environ["NCA_DB_PATH"] = os.path.join(tmp, "bench.db")
+
+    suites = {
+        "matching": lambda: bench_matching(args.sizes),
+        "emotion": lambda: bench_emotion(args.backend, args.batch_sizes),
+        "database": lambda: bench_database(args.rows),
+        "e2e": lambda: bench_e2e(args.video, args.backend),
+    }
+    results, skipped = {}, {}
+    try:
+        for name in args.suites:
+            print(f"{name}:", flush=True)
+            try:
+                results.update(suites[name]())
+            except ImportError as e:
+                # e.g. TensorFlow or dlib not installed on this machine
+                skipped[name] = f"{type(e).__name__}: {e}"
+                print(f"  skipped ({skipped[name]})", flush=True)
+    finally:
+        import database
+        database.close_emotion_log_writer()
+        database.close_db_connection()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    import numpy as np
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor(), "cpus": os.cpu_count(), "numpy": np.__version__},
+        "args": vars(args),
+        "results": results,
+        "skipped": skipped,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        changed = [name for name in ("sizes", "batch_sizes", "backend", "rows", "video")
+                   if baseline.get("args", {}).get(name) != report["args"][name]]
+        if changed:
+            print(f"Note: baseline was run with different {', '.join(changed)}; those metrics may not be comparable")
+        regressions = compare(results, baseline["results"], args.threshold, args.suites)
+        for metric, old, new, change in regressions:
+            if new is None:
+                reason = skipped.get(metric.split(".")[0])
+                print(f"MISSING {metric}: {old:.4g} in baseline, not measured{f' ({reason})' if reason else ''}")
+            else:
+                print(f"REGRESSION {metric}: {old:.4g} -> {new:.4g} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"OK: no metric worse than {args.threshold:.0%} vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# bulk_enroll.py
+"""Enroll criminals in bulk from a folder or CSV of mugshots
+
+    python bulk_enroll.py mugshots/                 # criminal ID from file names, details kept
+    python bulk_enroll.py records.csv --workers 8   # columns: criminal_id,name,age,crime,image_path
+
+Images are decoded and encoded in a process pool and written in chunked
+transactions. Criminals that already have an encoding are skipped, so an
+interrupted run can be restarted with the same command.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import time
+import cv2
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+
+_face_recognition = None  # per-worker face_recognition module
+
+
+def read_records(source):
+    """Yield (criminal_id, name, age, crime, image_path) from a directory or CSV file"""
+    if os.path.isdir(source):
+        for entry in sorted(os.scandir(source), key=lambda entry: entry.name):
+            stem, ext = os.path.splitext(entry.name)
+            if entry.is_file() and ext.lower() in IMAGE_EXTENSIONS:
+                # Only the encoding is known; existing names, ages and crimes are kept
+                yield (stem, None, None, None, entry.path)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, newline="") as file:
+            for row in csv.DictReader(file):
+                yield (row["criminal_id"], row.get("name") or row["criminal_id"], row.get("age") or None,
+                       row.get("crime") or None, os.path.join(base_dir, row["image_path"]))
+
+
+def _init_worker():
+    """Load the dlib models once per worker process"""
+    global _face_recognition
+    import face_recognition  # imported in the worker so the parent stays light
+    _face_recognition = face_recognition
+    cv2.setNumThreads(1)  # the pool already uses every CPU
+
+
+def encode_record(task):
+    """Worker: decode one image and return (record, encoding or None, error or None)"""
+    record, max_size = task
+    image = cv2.imread(record[4])
+    if image is None:
+        return record, None, "unreadable image"
+    height, width = image.shape[:2]
+    scale = max_size / max(height, width)
+    if scale < 1:  # large scans cost a lot in HOG detection and gain nothing
+        image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    encodings = _face_recognition.face_encodings(rgb)
+    if not encodings:
+        return record, None, "no face found"
+    return record, encodings[0], None
+
+
+def enroll(source, workers=None, chunk_size=500, max_size=800, failures_path=None):
+    """Encode every not-yet-enrolled record from source and store it, returns (enrolled, failed)"""
+    import database
+
+    records = list(read_records(source))
+    enrolled_ids = database.get_enrolled_criminal_ids(record[0] for record in records)
+    pending = [record for record in records if record[0] not in enrolled_ids]
+    print(f"{len(records)} records, {len(enrolled_ids)} already enrolled, {len(pending)} to process")
+
+    failures = open(failures_path, "a", newline="") if failures_path else None
+    failure_writer = csv.writer(failures) if failures else None
+    batch, enrolled, failed = [], 0, 0
+    start = time.perf_counter()
+
+    def write_batch():
+        nonlocal batch, enrolled
+        if batch:
+            enrolled += database.add_criminals_bulk(batch)
+            batch = []
+
+    # spawn: dlib is not fork-safe
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker) as pool:
+        tasks = ((record, max_size) for record in pending)
+        for done, (record, encoding, error) in enumerate(
+                pool.imap_unordered(encode_record, tasks, chunksize=8), start=1):
+            criminal_id, name, age, crime, image_path = record
+            if encoding is None:
+                failed += 1
+                if failure_writer:
+                    failure_writer.writerow([criminal_id, image_path, error])
+            else:
+                batch.append((name, age, crime, criminal_id, encoding))
+            if len(batch) >= chunk_size:
+                write_batch()
+            if done % 100 == 0 or done == len(pending):
+                elapsed = time.perf_counter() - start
+                print(f"{done}/{len(pending)} processed, {enrolled + len(batch)} enrolled, {failed} failed, "
+                      f"{done / elapsed:.1f} images/s", flush=True)
+    write_batch()
+    if failures:
+        failures.close()
+    return enrolled, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll criminals in bulk from mugshot images")
+    parser.add_argument("source", help="directory of images or CSV with criminal_id,name,age,crime,image_path")
+    parser.add_argument("--workers", type=int, default=None, help="encoder processes (default: all CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="criminals per database transaction")
+    parser.add_argument("--max-size", type=int, default=800, help="downscale images larger than this (px)")
+    parser.add_argument("--failures", help="append records that could not be enrolled to this CSV")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    enrolled, failed = enroll(args.source, args.workers, args.chunk_size, args.max_size, args.failures)
+    elapsed = time.perf_counter() - start
+    print(f"Enrolled {enrolled}, failed {failed} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,76 @@
 # database.py
+import os
 import sqlite3
-from datetime import datetime
+import weakref
+import threading
+import queue
+import time
+import atexit
+from collections import Counter
+import numpy as np
+import instrumentation
+
+_criminal_listeners = []
+
+def add_criminal_listener(callback):
+    """Register callback(action, criminal_id, encoding) for criminal changes
+    
+    Bound methods are held weakly so listeners die with their owner.
+    """
+    if hasattr(callback, "__self__"):
+        _criminal_listeners.append(weakref.WeakMethod(callback))
+    else:
+        _criminal_listeners.append(lambda: callback)
+
+def _notify_criminal_listeners(action, criminal_id, encoding=None):
+    """Tell registered listeners that the criminals table changed"""
+    for ref in list(_criminal_listeners):
+        callback = ref()
+        if callback is None:
+            _criminal_listeners.remove(ref)
+        else:
+            callback(action, criminal_id, encoding)
+
+DB_PATH = os.environ.get("NCA_DB_PATH", "users.db")
+_thread_state = threading.local()
+
+def _open_connection():
+    """Open a connection tuned for concurrent readers and batched writers"""
+    conn = sqlite3.connect(DB_PATH, timeout=30, cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")  # readers no longer block the log writer
+    conn.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent, fsync only at checkpoints
+    conn.execute("PRAGMA cache_size=-16000")  # 16 MB page cache
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
 
 def get_db_connection():
-    """Create and return a new database connection"""
-    return sqlite3.connect("users.db")
+    """Return this thread's persistent database connection, opening it on first use
+    
+    Connections are reused so statement caching pays off; do not close
+    them, use close_db_connection() when a thread is done.
+    """
+    conn = getattr(_thread_state, "conn", None)
+    if conn is None or _thread_state.pid != os.getpid():  # never reuse a forked parent's connection
+        conn = _thread_state.conn = _open_connection()
+        _thread_state.pid = os.getpid()
+    return conn
 
-def init_db():
-    """Initialize all database tables"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def close_db_connection():
+    """Close the calling thread's connection, if it has one"""
+    conn = getattr(_thread_state, "conn", None)
+    if conn is not None:
+        _thread_state.conn = None
+        conn.close()
     
-    cursor.execute("DROP TABLE IF EXISTS users")
+def _table_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [column[1] for column in cursor.fetchall()]
+
+def _migration_base_tables(cursor):
+    """Create the original users, criminals and emotion_logs tables"""
+    # Very old databases used an incompatible users layout, replace it once
+    if "users" in _table_names(cursor) and "username" not in _table_columns(cursor, "users"):
+        cursor.execute("DROP TABLE users")
     cursor.execute('''CREATE TABLE IF NOT EXISTS users (
                     id INTEGER PRIMARY KEY,
                     name TEXT UNIQUE,
@@ -39,9 +98,137 @@ def init_db():
                     emotion TEXT,
                     FOREIGN KEY (criminal_id) REFERENCES criminals(criminal_id)
                 )''')
-    
-    conn.commit()
-    conn.close()
+
+def _migration_encoding_column(cursor):
+    """Store face encodings as raw float32 bytes"""
+    if "encoding" not in _table_columns(cursor, "criminals"):
+        cursor.execute("ALTER TABLE criminals ADD COLUMN encoding BLOB")
+
+def _migration_criminal_changes(cursor):
+    """Change log for encodings, lets the memory-mapped snapshot update incrementally"""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS criminal_changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    criminal_id TEXT,
+                    action TEXT
+                )''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS criminals_encoding_insert
+                    AFTER INSERT ON criminals WHEN NEW.encoding IS NOT NULL
+                    BEGIN
+                        INSERT INTO criminal_changes (criminal_id, action) VALUES (NEW.criminal_id, 'add');
+                    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS criminals_encoding_update
+                    AFTER UPDATE OF encoding, criminal_id ON criminals
+                    BEGIN
+                        INSERT INTO criminal_changes (criminal_id, action)
+                        SELECT OLD.criminal_id, 'remove'
+                        WHERE OLD.encoding IS NOT NULL AND (NEW.encoding IS NULL OR NEW.criminal_id IS NOT OLD.criminal_id);
+                        INSERT INTO criminal_changes (criminal_id, action)
+                        SELECT NEW.criminal_id, 'add' WHERE NEW.encoding IS NOT NULL;
+                    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS criminals_encoding_delete
+                    AFTER DELETE ON criminals WHEN OLD.encoding IS NOT NULL
+                    BEGIN
+                        INSERT INTO criminal_changes (criminal_id, action) VALUES (OLD.criminal_id, 'remove');
+                    END''')
+
+def _migration_emotion_log_epoch_ms(cursor):
+    """Integer epoch-millisecond timestamps and a (criminal_id, timestamp) index"""
+    cursor.execute('''CREATE TABLE emotion_logs_new (
+                    id INTEGER PRIMARY KEY,
+                    criminal_id TEXT,
+                    timestamp INTEGER,
+                    emotion TEXT,
+                    FOREIGN KEY (criminal_id) REFERENCES criminals(criminal_id)
+                )''')
+    # Old timestamps are local-time text, 'utc' converts them before taking the epoch
+    cursor.execute("""INSERT INTO emotion_logs_new (id, criminal_id, timestamp, emotion)
+                   SELECT id, criminal_id, CAST(strftime('%s', timestamp, 'utc') AS INTEGER) * 1000, emotion
+                   FROM emotion_logs""")
+    cursor.execute("DROP TABLE emotion_logs")
+    cursor.execute("ALTER TABLE emotion_logs_new RENAME TO emotion_logs")
+    cursor.execute("CREATE INDEX idx_emotion_logs_criminal_time ON emotion_logs (criminal_id, timestamp)")
+
+def _migration_emotion_aggregates(cursor):
+    """Running per-criminal emotion counts and time-bucketed rollups"""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS emotion_totals (
+                    criminal_id TEXT,
+                    emotion TEXT,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (criminal_id, emotion)
+                ) WITHOUT ROWID''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS emotion_rollups (
+                    criminal_id TEXT,
+                    bucket_ms INTEGER,
+                    bucket_start INTEGER,
+                    emotion TEXT,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (criminal_id, bucket_ms, bucket_start, emotion)
+                ) WITHOUT ROWID''')
+    _backfill_emotion_aggregates(cursor)
+
+def _migration_criminal_search(cursor):
+    """Prefix-search indexes, plus an FTS5 index when SQLite was built with it"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_criminals_name ON criminals (name COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_criminals_crime ON criminals (crime COLLATE NOCASE)")
+    try:
+        cursor.execute('''CREATE VIRTUAL TABLE criminals_fts USING fts5 (
+                        criminal_id, name, crime, content='criminals', content_rowid='id'
+                    )''')
+    except sqlite3.OperationalError:
+        return  # no FTS5 in this build, search_criminals falls back to LIKE
+    cursor.execute('''CREATE TRIGGER criminals_fts_insert AFTER INSERT ON criminals BEGIN
+                        INSERT INTO criminals_fts (rowid, criminal_id, name, crime)
+                        VALUES (NEW.id, NEW.criminal_id, NEW.name, NEW.crime);
+                    END''')
+    cursor.execute('''CREATE TRIGGER criminals_fts_delete AFTER DELETE ON criminals BEGIN
+                        INSERT INTO criminals_fts (criminals_fts, rowid, criminal_id, name, crime)
+                        VALUES ('delete', OLD.id, OLD.criminal_id, OLD.name, OLD.crime);
+                    END''')
+    cursor.execute('''CREATE TRIGGER criminals_fts_update AFTER UPDATE OF criminal_id, name, crime ON criminals BEGIN
+                        INSERT INTO criminals_fts (criminals_fts, rowid, criminal_id, name, crime)
+                        VALUES ('delete', OLD.id, OLD.criminal_id, OLD.name, OLD.crime);
+                        INSERT INTO criminals_fts (rowid, criminal_id, name, crime)
+                        VALUES (NEW.id, NEW.criminal_id, NEW.name, NEW.crime);
+                    END''')
+    cursor.execute("INSERT INTO criminals_fts (criminals_fts) VALUES ('rebuild')")
+
+# Applied in order; PRAGMA user_version records how many have run.
+# Never edit a released migration, append a new one instead.
+MIGRATIONS = [
+    _migration_base_tables,
+    _migration_encoding_column,
+    _migration_criminal_changes,
+    _migration_emotion_log_epoch_ms,
+    _migration_emotion_aggregates,
+    _migration_criminal_search,
+]
+
+def _table_names(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    return [row[0] for row in cursor.fetchall()]
+
+def get_schema_version():
+    """Return the number of migrations applied to the database"""
+    return get_db_connection().execute("PRAGMA user_version").fetchone()[0]
+
+def init_db():
+    """Bring the database schema up to date, one migration per transaction"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    version = get_schema_version()
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # Another process may have migrated while we waited for the lock
+            if get_schema_version() >= number:
+                conn.rollback()
+                continue
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
 
 def add_officer(name, age, precinct_code, code, rank, badge_number):
     """Add a new police officer to the database"""
@@ -58,9 +245,8 @@ def add_officer(name, age, precinct_code, code, rank, badge_number):
         conn.commit()
         return username
     except sqlite3.IntegrityError:
+        conn.rollback()
         return None
-    finally:
-        conn.close()
 
 def verify_officer(username, code):
     """Verify police officer credentials"""
@@ -68,24 +254,122 @@ def verify_officer(username, code):
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE username=? AND code=?", (username, code))
     officer = cursor.fetchone()
-    conn.close()
     return officer
 
-def add_criminal(name, age, crime, criminal_id):
+def encoding_to_blob(encoding):
+    """Serialize a face encoding as raw float32 bytes"""
+    return np.asarray(encoding, dtype=np.float32).tobytes()
+
+def add_criminal(name, age, crime, criminal_id, encoding=None):
     """Add a new criminal to the database"""
     conn = get_db_connection()
     cursor = conn.cursor()
+    blob = encoding_to_blob(encoding) if encoding is not None else None
     try:
         cursor.execute("""INSERT INTO criminals 
-                       (name, age, crime, criminal_id) 
-                       VALUES (?, ?, ?, ?)""",
-                       (name, age, crime, criminal_id))
+                       (name, age, crime, criminal_id, encoding) 
+                       VALUES (?, ?, ?, ?, ?)""",
+                       (name, age, crime, criminal_id, blob))
         conn.commit()
+        _notify_criminal_listeners("add", criminal_id, encoding)
         return True
     except sqlite3.IntegrityError:
+        conn.rollback()
         return False
-    finally:
-        conn.close()
+
+def add_criminals_bulk(criminals):
+    """Insert or update (name, age, crime, criminal_id, encoding) rows in one transaction
+    
+    Existing criminal IDs keep any detail given as None and get the rest
+    replaced, so mugshots can be attached to existing records and an
+    interrupted bulk import can simply be re-run. New IDs without a name
+    are named after their ID.
+    """
+    conn = get_db_connection()
+    rows = [(name, age, crime, criminal_id, encoding_to_blob(encoding) if encoding is not None else None)
+            for name, age, crime, criminal_id, encoding in criminals]
+    try:
+        conn.executemany("""INSERT INTO criminals (name, age, crime, criminal_id, encoding) 
+                         VALUES (COALESCE(?1, ?4), ?2, ?3, ?4, ?5)
+                         ON CONFLICT (criminal_id) DO UPDATE SET 
+                         name = COALESCE(?1, name), age = COALESCE(?2, age), 
+                         crime = COALESCE(?3, crime), encoding = COALESCE(?5, encoding)""", rows)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    for name, age, crime, criminal_id, encoding in criminals:
+        _notify_criminal_listeners("add", criminal_id, encoding)
+    return len(rows)
+
+def get_enrolled_criminal_ids(criminal_ids):
+    """Return the subset of criminal_ids that already have a face encoding"""
+    cursor = get_db_connection().cursor()
+    enrolled = set()
+    criminal_ids = list(criminal_ids)
+    for start in range(0, len(criminal_ids), 500):  # stay under SQLite's variable limit
+        chunk = criminal_ids[start:start + 500]
+        cursor.execute(f"""SELECT criminal_id FROM criminals 
+                       WHERE encoding IS NOT NULL AND criminal_id IN ({','.join('?' * len(chunk))})""",
+                       chunk)
+        enrolled.update(row[0] for row in cursor.fetchall())
+    return enrolled
+
+def set_criminal_encoding(criminal_id, encoding):
+    """Store the face encoding for an existing criminal"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("UPDATE criminals SET encoding=? WHERE criminal_id=?",
+                   (encoding_to_blob(encoding), criminal_id))
+    affected = cursor.rowcount
+    conn.commit()
+    if affected > 0:
+        _notify_criminal_listeners("add", criminal_id, encoding)
+    return affected > 0
+
+def load_criminal_encodings():
+    """Bulk-load every stored encoding as (criminal_ids, N x 128 float32 matrix)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT criminal_id, encoding FROM criminals WHERE encoding IS NOT NULL")
+    rows = cursor.fetchall()
+    if not rows:
+        return [], np.empty((0, 128), dtype=np.float32)
+    criminal_ids = [row[0] for row in rows]
+    matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32)
+    return criminal_ids, matrix.reshape(len(rows), -1)
+
+def get_criminal_encodings(criminal_ids):
+    """Return {criminal_id: encoding} for the given IDs that have an encoding"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    encodings = {}
+    criminal_ids = list(criminal_ids)
+    for start in range(0, len(criminal_ids), 500):  # stay under SQLite's variable limit
+        chunk = criminal_ids[start:start + 500]
+        cursor.execute(f"""SELECT criminal_id, encoding FROM criminals 
+                       WHERE encoding IS NOT NULL AND criminal_id IN ({','.join('?' * len(chunk))})""",
+                       chunk)
+        for criminal_id, blob in cursor.fetchall():
+            encodings[criminal_id] = np.frombuffer(blob, dtype=np.float32)
+    return encodings
+
+def get_criminal_change_seq():
+    """Return the sequence number of the latest encoding change"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM criminal_changes")
+    seq = cursor.fetchone()[0]
+    return seq
+
+def get_criminal_changes(since_seq):
+    """Return (seq, criminal_id, action) encoding changes newer than since_seq"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""SELECT seq, criminal_id, action FROM criminal_changes 
+                   WHERE seq > ? ORDER BY seq""", (since_seq,))
+    changes = cursor.fetchall()
+    return changes
 
 def get_all_criminals():
     """Retrieve all criminals from the database"""
@@ -93,16 +377,59 @@ def get_all_criminals():
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM criminals")
     criminals = cursor.fetchall()
-    conn.close()
     return criminals
 
+def _has_fts():
+    cursor = get_db_connection().cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name='criminals_fts'")
+    return cursor.fetchone() is not None
+
+def search_criminals(query="", after=None, limit=100, before=None):
+    """Page through criminals ordered by criminal_id, optionally filtered by a prefix search
+    
+    Every word in query must prefix-match the ID, name or crime. Pass the
+    last criminal_id of the previous page as after to get the next page, or
+    the first criminal_id of a page as before to get the one preceding it.
+    Rows are (id, name, age, crime, criminal_id).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    words = query.split()
+    if not words:
+        conditions, params = [], []
+    elif _has_fts():
+        match = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+        conditions = ["c.id IN (SELECT rowid FROM criminals_fts WHERE criminals_fts MATCH ?)"]
+        params = [match]
+    else:
+        conditions, params = [], []
+        for word in words:
+            pattern = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            # Like FTS5, match the start of any word in the name or crime
+            conditions.append("""(c.criminal_id LIKE ? ESCAPE '\\' OR c.name LIKE ? ESCAPE '\\' 
+                              OR c.name LIKE ? ESCAPE '\\' OR c.crime LIKE ? ESCAPE '\\' 
+                              OR c.crime LIKE ? ESCAPE '\\')""")
+            params += [pattern, pattern, "% " + pattern, pattern, "% " + pattern]
+    if before is not None:
+        conditions.append("c.criminal_id < ?")
+        params.append(before)
+        order = "DESC"
+    else:
+        conditions.append("c.criminal_id > ?")
+        params.append(after if after is not None else "")
+        order = "ASC"
+    cursor.execute(f"""SELECT c.id, c.name, c.age, c.crime, c.criminal_id FROM criminals c 
+                   WHERE {' AND '.join(conditions)} ORDER BY c.criminal_id {order} LIMIT ?""",
+                   params + [limit])
+    rows = cursor.fetchall()
+    return rows[::-1] if before is not None else rows
+
 def get_criminal_by_id(criminal_id):
     """Get a specific criminal by ID"""
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM criminals WHERE criminal_id=?", (criminal_id,))
     criminal = cursor.fetchone()
-    conn.close()
     return criminal
 
 def remove_criminal(criminal_id):
@@ -112,30 +439,269 @@ def remove_criminal(criminal_id):
     cursor.execute("DELETE FROM criminals WHERE criminal_id=?", (criminal_id,))
     affected = cursor.rowcount
     conn.commit()
-    conn.close()
+    if affected > 0:
+        _notify_criminal_listeners("remove", criminal_id)
     return affected > 0
 
-def log_emotion(criminal_id, emotion):
-    """Log an emotion detection for a criminal"""
+NEGATIVE_EMOTIONS = ("Angry", "Disgust", "Fear", "Sad")
+
+# Rollup granularities kept alongside the per-criminal totals
+ROLLUP_BUCKETS = {"minute": 60_000, "hour": 3_600_000, "day": 86_400_000}
+
+def _insert_emotion_logs(conn, rows):
+    """Insert (criminal_id, epoch_ms, emotion) rows and update the aggregates, no commit"""
+    conn.executemany("""INSERT INTO emotion_logs 
+                     (criminal_id, timestamp, emotion) 
+                     VALUES (?, ?, ?)""", rows)
+    totals = Counter((criminal_id, emotion) for criminal_id, _, emotion in rows)
+    conn.executemany("""INSERT INTO emotion_totals (criminal_id, emotion, count) VALUES (?, ?, ?)
+                     ON CONFLICT (criminal_id, emotion) DO UPDATE SET count = count + excluded.count""",
+                     [(criminal_id, emotion, count) for (criminal_id, emotion), count in totals.items()])
+    rollups = Counter((criminal_id, bucket_ms, timestamp - timestamp % bucket_ms, emotion)
+                      for criminal_id, timestamp, emotion in rows
+                      for bucket_ms in ROLLUP_BUCKETS.values())
+    conn.executemany("""INSERT INTO emotion_rollups (criminal_id, bucket_ms, bucket_start, emotion, count)
+                     VALUES (?, ?, ?, ?, ?)
+                     ON CONFLICT (criminal_id, bucket_ms, bucket_start, emotion)
+                     DO UPDATE SET count = count + excluded.count""",
+                     [key + (count,) for key, count in rollups.items()])
+
+def _backfill_emotion_aggregates(cursor):
+    """Recompute the aggregate tables from emotion_logs"""
+    cursor.execute("DELETE FROM emotion_totals")
+    cursor.execute("DELETE FROM emotion_rollups")
+    cursor.execute("""INSERT INTO emotion_totals (criminal_id, emotion, count)
+                   SELECT criminal_id, emotion, COUNT(*) FROM emotion_logs 
+                   GROUP BY criminal_id, emotion""")
+    for bucket_ms in ROLLUP_BUCKETS.values():
+        cursor.execute("""INSERT INTO emotion_rollups (criminal_id, bucket_ms, bucket_start, emotion, count)
+                       SELECT criminal_id, ?, timestamp - timestamp % ?, emotion, COUNT(*) 
+                       FROM emotion_logs GROUP BY criminal_id, timestamp - timestamp % ?, emotion""",
+                       (bucket_ms, bucket_ms, bucket_ms))
+
+def rebuild_emotion_aggregates():
+    """Backfill emotion_totals/emotion_rollups from the existing emotion_logs"""
+    flush_emotion_logs()
     conn = get_db_connection()
     cursor = conn.cursor()
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    cursor.execute("""INSERT INTO emotion_logs 
-                   (criminal_id, timestamp, emotion) 
-                   VALUES (?, ?, ?)""",
-                   (criminal_id, timestamp, emotion))
-    conn.commit()
-    conn.close()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        _backfill_emotion_aggregates(cursor)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+class EmotionLogWriter:
+    """Background writer that batches emotion log rows into executemany transactions
+    
+    Rows are written once batch_size are queued or the oldest has waited
+    flush_interval seconds, so callers never wait on a commit.
+    """
+    
+    def __init__(self, batch_size=256, flush_interval=0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="emotion-log-writer", daemon=True)
+        self.thread.start()
+    
+    def write(self, criminal_id, timestamp, emotion):
+        self.queue.put((criminal_id, timestamp, emotion))
+    
+    def flush(self, timeout=None):
+        """Block until every row queued so far is committed, returns False on timeout"""
+        if not self.thread.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        self.queue.put(None)
+        self.thread.join()
+    
+    def _write_batch(self, conn, rows):
+        with instrumentation.timer("db_write"):
+            _insert_emotion_logs(conn, rows)
+            conn.commit()
+        instrumentation.count("emotion_log_rows", len(rows))
+    
+    def _run(self):
+        rows, waiters, deadline = [], [], None
+        running = True
+        try:
+            conn = get_db_connection()
+            while running:
+                timeout = max(0, deadline - time.monotonic()) if rows else None
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = False  # flush interval elapsed
+                if isinstance(item, tuple):
+                    rows.append(item)
+                    if len(rows) == 1:
+                        deadline = time.monotonic() + self.flush_interval
+                    if len(rows) < self.batch_size:
+                        continue
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is None:
+                    running = False
+                try:
+                    if rows:
+                        self._write_batch(conn, rows)
+                except Exception as e:  # a bad row must not stop logging for the rest of the process
+                    conn.rollback()
+                    print(f"Failed to write {len(rows)} emotion logs: {e}")
+                finally:
+                    rows = []
+                    for waiter in waiters:
+                        waiter.set()
+                    waiters = []
+        finally:
+            # Never leave a flush() waiting on a writer that is gone
+            for waiter in waiters:
+                waiter.set()
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+            close_db_connection()
+
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+def _get_log_writer():
+    """Start the shared emotion log writer on first use"""
+    global _log_writer
+    with _log_writer_lock:
+        if _log_writer is None:
+            _log_writer = EmotionLogWriter()
+        return _log_writer
+
+def flush_emotion_logs(timeout=10.0):
+    """Wait (at most timeout seconds) until all queued emotion logs are committed"""
+    if _log_writer is not None and not _log_writer.flush(timeout):
+        print("Emotion logs not flushed: the log writer is stopped or stalled")
+
+@atexit.register
+def close_emotion_log_writer():
+    """Flush and stop the emotion log writer (runs automatically on shutdown)"""
+    global _log_writer
+    with _log_writer_lock:
+        writer, _log_writer = _log_writer, None
+    if writer is not None:
+        writer.close()
+
+def log_emotion(criminal_id, emotion):
+    """Queue an emotion detection for a criminal, written in the background"""
+    timestamp = int(time.time() * 1000)  # epoch milliseconds
+    _get_log_writer().write(criminal_id, timestamp, emotion)
+
+def log_emotions_bulk(rows):
+    """Write (criminal_id, epoch_ms, emotion) rows immediately in one transaction"""
+    conn = get_db_connection()
+    try:
+        with instrumentation.timer("db_write"):
+            _insert_emotion_logs(conn, rows)
+            conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    instrumentation.count("emotion_log_rows", len(rows))
+    return len(rows)
 
 def get_emotion_logs(criminal_id):
-    """Get all emotion logs for a criminal"""
+    """Get all (epoch_ms, emotion) logs for a criminal in time order"""
+    flush_emotion_logs()
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""SELECT timestamp, emotion FROM emotion_logs 
                    WHERE criminal_id=? ORDER BY timestamp""", (criminal_id,))
     logs = cursor.fetchall()
-    conn.close()
     return logs
 
+def get_emotion_counts(criminal_id):
+    """Return {emotion: count} of all logs for a criminal from the running totals"""
+    flush_emotion_logs()
+    cursor = get_db_connection().cursor()
+    cursor.execute("SELECT emotion, count FROM emotion_totals WHERE criminal_id=?", (criminal_id,))
+    return dict(cursor.fetchall())
+
+def get_emotion_rollup(criminal_id, bucket="hour", start_ms=None, end_ms=None):
+    """Return (bucket_start_ms, emotion, count) rows for one rollup granularity"""
+    flush_emotion_logs()
+    cursor = get_db_connection().cursor()
+    cursor.execute("""SELECT bucket_start, emotion, count FROM emotion_rollups 
+                   WHERE criminal_id=? AND bucket_ms=? AND bucket_start >= ? AND bucket_start < ?
+                   ORDER BY bucket_start""",
+                   (criminal_id, ROLLUP_BUCKETS[bucket],
+                    start_ms if start_ms is not None else -2**63,
+                    end_ms if end_ms is not None else 2**63 - 1))
+    return cursor.fetchall()
+
+def get_emotion_log_range(criminal_id):
+    """Return (first_ms, last_ms) of a criminal's logs, or None if there are none"""
+    flush_emotion_logs()
+    cursor = get_db_connection().cursor()
+    cursor.execute("SELECT MIN(timestamp), MAX(timestamp) FROM emotion_logs WHERE criminal_id=?",
+                   (criminal_id,))
+    first_ms, last_ms = cursor.fetchone()
+    return None if first_ms is None else (first_ms, last_ms)
+
+def get_emotion_series(criminal_id, start_ms, end_ms, max_points=600):
+    """Downsample logs in [start_ms, end_ms] to at most max_points buckets
+    
+    Each bucket reports its most frequent emotion, so a chart of hours of
+    per-frame logs costs the same as a chart of a few minutes.
+    Returns (bucket_start_ms, emotion, count) rows in time order.
+    """
+    flush_emotion_logs()
+    span = end_ms - start_ms + 1
+    width = max(1, -(-span // max_points))  # ceiling division
+    # Wide windows read the coarsest pre-aggregated rollup that still has a bucket
+    # per point, instead of every raw row
+    rollup_ms = max((ms for ms in ROLLUP_BUCKETS.values() if span // ms >= max_points), default=None)
+    if rollup_ms:
+        width = -(-width // rollup_ms) * rollup_ms  # whole rollup buckets per point
+        source = """SELECT bucket_start AS timestamp, emotion, count FROM emotion_rollups 
+                 WHERE criminal_id = :criminal_id AND bucket_ms = :rollup_ms 
+                 AND bucket_start > :start - :rollup_ms AND bucket_start <= :end"""
+    else:
+        source = """SELECT timestamp, emotion, 1 AS count FROM emotion_logs 
+                 WHERE criminal_id = :criminal_id AND timestamp BETWEEN :start AND :end"""
+    cursor = get_db_connection().cursor()
+    cursor.execute(f"""WITH counts AS (
+                       SELECT (timestamp - :start) / :width AS bucket, emotion, SUM(count) AS n,
+                              MIN(timestamp) AS first_seen
+                       FROM ({source})
+                       GROUP BY bucket, emotion
+                   ), ranked AS (
+                       SELECT bucket, emotion, n, ROW_NUMBER() OVER (
+                           PARTITION BY bucket ORDER BY n DESC, first_seen) AS rank
+                       FROM counts
+                   )
+                   SELECT :start + bucket * :width, emotion, n FROM ranked 
+                   WHERE rank = 1 ORDER BY bucket""",
+                   {"criminal_id": criminal_id, "start": start_ms, "end": end_ms, "width": width,
+                    "rollup_ms": rollup_ms})
+    return cursor.fetchall()
+
 # Initialize the database
-init_db()
\ No newline at end of file
+init_db()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Database maintenance")
+    parser.add_argument("command", choices=["migrate", "rebuild-aggregates"])
+    args = parser.parse_args()
+    if args.command == "rebuild-aggregates":
+        start = time.perf_counter()
+        rebuild_emotion_aggregates()
+        print(f"Rebuilt emotion aggregates in {time.perf_counter() - start:.1f}s")
+    print(f"Schema version {get_schema_version()}")
\ No newline at end of file
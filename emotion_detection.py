@@ -1,54 +1,210 @@
-import tensorflow as tf
+import os
+import threading
 import cv2
 import numpy as np
 import database
+import instrumentation
 from datetime import datetime
+from inference_scheduler import BatchScheduler
+
+KERAS_MODEL_PATH = "emotion_model.keras"
+H5_MODEL_PATH = "emotion_model.h5"  # the trained model shipped with the repository
+TFLITE_MODEL_PATH = "emotion_model.tflite"
+
+def _load_tflite_interpreter(model_path):
+    """Create a TFLite interpreter, preferring the standalone runtimes over full TensorFlow"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path)
+
+class TFLiteEmotionModel:
+    """Callable wrapper giving a TFLite model the same batch -> probabilities interface as Keras"""
+    
+    def __init__(self, model_path=TFLITE_MODEL_PATH):
+        self.interpreter = _load_tflite_interpreter(model_path)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = int(self.input["shape"][0])
+        self.lock = threading.Lock()  # interpreters are not thread-safe
+    
+    def __call__(self, batch, training=False):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self.lock:
+            if len(batch) != self.batch_size:
+                self.interpreter.resize_tensor_input(self.input["index"], [len(batch), 48, 48, 1])
+                self.interpreter.allocate_tensors()
+                self.input = self.interpreter.get_input_details()[0]
+                self.output = self.interpreter.get_output_details()[0]
+                self.batch_size = len(batch)
+            scale, zero_point = self.input["quantization"]
+            if scale:  # int8 model: quantize the input
+                batch = np.clip(np.round(batch / scale + zero_point), -128, 127)
+            self.interpreter.set_tensor(self.input["index"], batch.astype(self.input["dtype"]))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output["index"])
+            scale, zero_point = self.output["quantization"]
+            if scale:
+                output = (output.astype(np.float32) - zero_point) * scale
+            return output.astype(np.float32)
+
+def default_keras_model_path():
+    """emotion_model.keras if it exists, otherwise the shipped emotion_model.h5"""
+    if not os.path.exists(KERAS_MODEL_PATH) and os.path.exists(H5_MODEL_PATH):
+        return H5_MODEL_PATH
+    return KERAS_MODEL_PATH
+
+def load_emotion_model(backend="keras", model_path=None):
+    """Load the emotion CNN with the 'keras' or 'tflite' (no TensorFlow needed) backend"""
+    if backend not in ("keras", "tflite"):
+        raise ValueError(f"Unknown emotion model backend '{backend}', expected 'keras' or 'tflite'")
+    model_path = model_path or (TFLITE_MODEL_PATH if backend == "tflite" else default_keras_model_path())
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Emotion model {model_path} not found")
+    if backend == "tflite":
+        return TFLiteEmotionModel(model_path)
+    import tensorflow as tf  # deferred: importing TensorFlow takes seconds
+    return tf.keras.models.load_model(model_path)
 
 class EmotionDetector:
-    def __init__(self):
-        self.emotion_model = tf.keras.models.load_model("emotion_model.keras")
+    def __init__(self, backend=None, model_path=None, detection_scale=None):
+        # NCA_EMOTION_BACKEND=tflite runs the exported model from export_emotion_model.py
+        backend = backend or os.environ.get("NCA_EMOTION_BACKEND", "keras")
+        # Fraction of the frame resolution face detection runs at (NCA_DETECTION_SCALE=0.5 for 1080p)
+        self.detection_scale = detection_scale or float(os.environ.get("NCA_DETECTION_SCALE", 1.0))
+        self.emotion_model = load_emotion_model(backend, model_path)
         self.emotion_labels = ['Angry', 'Disgust', 'Fear', 'Happy', 'Sad', 'Surprise', 'Neutral']
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self._thread_state = threading.local()
+    
+    @property
+    def face_cascade(self):
+        """This thread's cascade: detectMultiScale is not safe to call concurrently on one instance"""
+        cascade = getattr(self._thread_state, "face_cascade", None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            self._thread_state.face_cascade = cascade
+        return cascade
+    
+    def warm_up(self):
+        """Run one dummy inference so the first real frame skips graph tracing"""
+        self.classify_faces(np.zeros((1, 48, 48, 1), dtype='float32'))
+    
+    def detect_faces(self, gray, scale=None, regions=None):
+        """Return (x, y, w, h) boxes of the faces in a grayscale frame
+        
+        scale < 1 (default detection_scale) runs the cascade on a downscaled
+        copy and regions limits the search to (x, y, w, h) areas; boxes are
+        always in frame pixels.
+        """
+        scale = scale or self.detection_scale
+        frame_h, frame_w = gray.shape[:2]
+        if regions is None:
+            regions = [(0, 0, frame_w, frame_h)]
+        min_size = max(24, int(round(30 * scale)))  # 24 px is the cascade's own window
+        boxes = []
+        with instrumentation.timer("detection"):
+            for rx, ry, rw, rh in regions:
+                area = gray[ry:ry+rh, rx:rx+rw]
+                if scale != 1.0:
+                    area = cv2.resize(area, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                if area.shape[0] < min_size or area.shape[1] < min_size:
+                    continue
+                faces = self.face_cascade.detectMultiScale(area, scaleFactor=1.3, minNeighbors=5,
+                                                           minSize=(min_size, min_size))
+                for x, y, w, h in faces:
+                    x, y = rx + int(x / scale), ry + int(y / scale)
+                    boxes.append((x, y, min(int(w / scale), frame_w - x), min(int(h / scale), frame_h - y)))
+        return boxes
+    
+    def preprocess_faces(self, gray, boxes):
+        """Crop, resize and stack face regions into one (N, 48, 48, 1) batch"""
+        batch = np.empty((len(boxes), 48, 48, 1), dtype='float32')
+        for i, (x, y, w, h) in enumerate(boxes):
+            batch[i, :, :, 0] = cv2.resize(gray[y:y+h, x:x+w], (48, 48))
+        batch /= 255.0
+        return batch
+    
+    def classify_faces(self, batch):
+        """Return per-face emotion probabilities for a preprocessed batch"""
+        if len(batch) == 0:
+            return np.empty((0, len(self.emotion_labels)), dtype='float32')
+        # Calling the model directly skips Model.predict's per-call setup
+        with instrumentation.timer("emotion_inference"):
+            return np.asarray(self.emotion_model(batch, training=False))
+    
+    def create_scheduler(self, max_batch_size=32, max_delay=0.010):
+        """Create a scheduler that batches face crops across frames and cameras"""
+        return BatchScheduler(self.classify_faces, max_batch_size=max_batch_size, max_delay=max_delay)
+    
+    def detect_emotions(self, frame, scheduler=None):
+        """Detect every face in the frame and classify them in a single batch
+        
+        Pass a shared scheduler to merge this frame's faces with other
+        streams' into larger micro-batches.
+        Returns a list of (emotion, probabilities, (x, y, w, h)) per face.
+        """
+        with instrumentation.timer("color_conversion"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        boxes = self.detect_faces(gray)
+        if not boxes:
+            return []
+        batch = self.preprocess_faces(gray, boxes)
+        if scheduler is not None:
+            probabilities = [future.result() for future in scheduler.submit_many(batch)]
+        else:
+            probabilities = self.classify_faces(batch)
+        return [(self.emotion_labels[int(np.argmax(probs))], probs, box)
+                for probs, box in zip(probabilities, boxes)]
     
     def detect_emotion(self, frame):
         """Detect emotion from a face in the frame"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5, minSize=(30, 30))
+        with instrumentation.timer("color_conversion"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        boxes = self.detect_faces(gray)
         
-        if len(faces) == 0:
+        if len(boxes) == 0:
             return None, None
         
-        x, y, w, h = faces[0]
-        face_roi = gray[y:y+h, x:x+w]
-        face_roi = cv2.resize(face_roi, (48, 48))
-        face_roi = np.expand_dims(face_roi, axis=0)
-        face_roi = np.expand_dims(face_roi, axis=-1)
-        face_roi = face_roi.astype('float32') / 255.0
-        
-        emotion_prediction = self.emotion_model.predict(face_roi, verbose=0)
-        emotion_index = np.argmax(emotion_prediction)
+        emotion_prediction = self.classify_faces(self.preprocess_faces(gray, boxes[:1]))
+        emotion_index = np.argmax(emotion_prediction[0])
         predicted_emotion = self.emotion_labels[emotion_index]
         
-        return predicted_emotion, (x, y, w, h)
+        return predicted_emotion, boxes[0]
     
-    def analyze_emotion_trends(self, criminal_id):
-        """Analyze emotion trends for a criminal and return conclusion"""
-        logs = database.get_emotion_logs(criminal_id)
-        if not logs:
-            return "Insufficient Data", []
-        
-        emotions = [log[1] for log in logs]
-        negative_emotions = ["Angry", "Disgust", "Fear", "Sad"]
-        total = len(emotions)
-        negative_count = sum(1 for emotion in emotions if emotion in negative_emotions)
-        
-        negative_ratio = negative_count / total
-        if negative_ratio > 0.5:  # More than 50% negative emotions
+    @staticmethod
+    def emotion_conclusion(criminal_id):
+        """Return (conclusion, negative_count, total) from the running emotion totals"""
+        counts = database.get_emotion_counts(criminal_id)
+        total = sum(counts.values())
+        if total == 0:
+            return "Insufficient Data", 0, 0
+        negative_count = sum(counts.get(emotion, 0) for emotion in database.NEGATIVE_EMOTIONS)
+        if negative_count / total > 0.5:  # More than 50% negative emotions
             conclusion = "Confirmed suspect"
         else:
             conclusion = "Innocent civilian"
+        return conclusion, negative_count, total
+    
+    def analyze_emotion_trends(self, criminal_id, include_sequence=True):
+        """Analyze emotion trends for a criminal and return conclusion
+        
+        The conclusion comes from pre-aggregated counts; the full
+        (timestamps, emotions) sequence is only read if include_sequence.
+        """
+        conclusion, _, total = self.emotion_conclusion(criminal_id)
+        if total == 0:
+            return conclusion, []
+        if not include_sequence:
+            return conclusion, []
         
+        logs = database.get_emotion_logs(criminal_id)
         timestamps = [log[0] for log in logs]
         emotion_sequence = [log[1] for log in logs]
         
-        return conclusion, (timestamps, emotion_sequence)
\ No newline at end of file
+        return conclusion, (timestamps, emotion_sequence)
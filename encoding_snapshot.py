@@ -0,0 +1,183 @@
+# encoding_snapshot.py
+"""On-disk snapshot of the criminal watchlist for memory-mapped loading
+
+Layout (little endian):
+    header   64 bytes, see HEADER_FORMAT
+    matrix   count x dim float32, starting on a page boundary
+    ID table criminal IDs as UTF-8, newline separated, right after the matrix
+
+Processes open the matrix with np.memmap, so every worker shares the same
+page-cached copy and startup cost does not grow with the watchlist.
+Trained IVF centroids are kept next to the snapshot (<path>.centroids)
+so only the first process after a watchlist change runs k-means.
+"""
+import os
+import struct
+import threading
+import zipfile
+from contextlib import contextmanager
+import numpy as np
+from watchlist_index import ENCODING_DIM
+
+MAGIC = b"NCAENC01"
+HEADER_FORMAT = "<8sIIQQQQ"  # magic, version, dim, count, matrix_offset, ids_length, change_seq
+HEADER_SIZE = 64
+FORMAT_VERSION = 1
+PAGE_SIZE = 4096
+DEFAULT_SNAPSHOT_PATH = "criminal_encodings.snapshot"
+
+
+class EncodingSnapshot:
+    """Read-only view of a snapshot file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+            (magic, version, self.dim, self.count, self.matrix_offset,
+             ids_length, self.change_seq) = struct.unpack_from(HEADER_FORMAT, header)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a version {FORMAT_VERSION} encoding snapshot")
+            file.seek(self.ids_offset)
+            ids_blob = file.read(ids_length).decode("utf-8")
+        self.ids = ids_blob.split("\n") if self.count else []
+        if self.count:
+            self.encodings = np.memmap(path, dtype=np.float32, mode="r", offset=self.matrix_offset,
+                                       shape=(self.count, self.dim))
+        else:
+            self.encodings = np.empty((0, self.dim), dtype=np.float32)
+
+    @property
+    def ids_offset(self):
+        return self.matrix_offset + self.count * self.dim * 4
+
+
+def write_snapshot(path, criminal_ids, encodings, change_seq):
+    """Write a complete snapshot atomically (readers keep their old mapping)
+
+    Callers other than refresh_snapshot should hold _snapshot_lock.
+    """
+    # An empty watchlist is the normal state until encodings are enrolled
+    encodings = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+    dim = ENCODING_DIM
+    ids_blob = "\n".join(criminal_ids).encode("utf-8")
+    tmp_path = f"{path}.tmp{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "wb") as file:
+        file.write(_pack_header(dim, len(criminal_ids), len(ids_blob), change_seq))
+        file.seek(PAGE_SIZE)
+        file.write(encodings.tobytes())
+        file.write(ids_blob)
+    os.replace(tmp_path, path)
+
+
+def save_centroids(path, centroids, change_seq):
+    """Store IVF centroids trained on the snapshot at change_seq next to it"""
+    tmp_path = f"{path}.centroids.tmp{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "wb") as file:
+        np.savez(file, centroids=centroids, change_seq=change_seq)
+    os.replace(tmp_path, f"{path}.centroids")
+
+
+def load_centroids(path, change_seq):
+    """Centroids saved for the snapshot at change_seq, or None"""
+    try:
+        with np.load(f"{path}.centroids") as data:
+            if int(data["change_seq"]) == change_seq:
+                return data["centroids"]
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        pass
+    return None
+
+
+def _pack_header(dim, count, ids_length, change_seq):
+    header = struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, dim, count, PAGE_SIZE,
+                         ids_length, change_seq)
+    return header.ljust(HEADER_SIZE, b"\0")
+
+
+@contextmanager
+def _snapshot_lock(path):
+    """Exclusive inter-process lock held while a snapshot is rebuilt"""
+    with open(f"{path}.lock", "a+b") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after about 10 s
+                    pass
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _open_snapshot(path):
+    """The snapshot at path, or None if it is missing or unreadable"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return EncodingSnapshot(path)
+    except (ValueError, struct.error):
+        return None
+
+
+def _apply_changes(snapshot, changes, db):
+    """(ids, encodings) with add/update changes applied, or None when a full rebuild is needed"""
+    if any(action != "add" for _, _, action in changes):
+        return None
+    changed_ids = list(dict.fromkeys(criminal_id for _, criminal_id, _ in changes))
+    current = db.get_criminal_encodings(changed_ids)
+    if len(current) != len(changed_ids):
+        return None  # an encoding vanished after being added
+
+    rows = {criminal_id: row for row, criminal_id in enumerate(snapshot.ids)}
+    new_ids = [criminal_id for criminal_id in changed_ids if criminal_id not in rows]
+    encodings = np.empty((snapshot.count + len(new_ids), snapshot.dim), dtype=np.float32)
+    encodings[:snapshot.count] = snapshot.encodings
+    for criminal_id in changed_ids:
+        row = rows.get(criminal_id)
+        if row is None:
+            row = rows[criminal_id] = len(rows)
+        encodings[row] = current[criminal_id]
+    return snapshot.ids + new_ids, encodings
+
+
+def refresh_snapshot(db, path=DEFAULT_SNAPSHOT_PATH):
+    """Bring the snapshot up to date with the criminals table and open it
+
+    The file is never modified in place: a new version is written next to
+    it and swapped in with os.replace, so processes that have the old one
+    mapped keep a consistent view. Rebuilds are serialised with a lock
+    file; removals (or an unreadable file) trigger a full rebuild.
+    """
+    snapshot = _open_snapshot(path)
+    if snapshot is not None and not db.get_criminal_changes(snapshot.change_seq):
+        return snapshot
+
+    with _snapshot_lock(path):
+        # Another process may have brought it up to date while we waited
+        snapshot = _open_snapshot(path)
+        if snapshot is not None:
+            changes = db.get_criminal_changes(snapshot.change_seq)
+            if not changes:
+                return snapshot
+            updated = _apply_changes(snapshot, changes, db)
+            if updated is not None:
+                write_snapshot(path, *updated, changes[-1][0])
+                return EncodingSnapshot(path)
+
+        change_seq = db.get_criminal_change_seq()
+        criminal_ids, encodings = db.load_criminal_encodings()
+        write_snapshot(path, criminal_ids, encodings, change_seq)
+    return EncodingSnapshot(path)
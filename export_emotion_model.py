@@ -0,0 +1,82 @@
+# export_emotion_model.py
+"""Export the Keras emotion CNN to TFLite and check it against the original
+
+    python export_emotion_model.py                          # float16 weights
+    python export_emotion_model.py --quantize int8 --calibration-dir faces/
+    python export_emotion_model.py --check-only --calibration-dir faces/
+
+Run EmotionDetector with backend="tflite" (or NCA_EMOTION_BACKEND=tflite)
+to use the exported model without importing TensorFlow.
+"""
+import argparse
+import glob
+import os
+import sys
+import cv2
+import numpy as np
+from emotion_detection import TFLITE_MODEL_PATH, TFLiteEmotionModel, default_keras_model_path
+
+
+def load_samples(calibration_dir=None, count=500, seed=0):
+    """(N, 48, 48, 1) float32 face crops from a directory, or random images if none given"""
+    if calibration_dir:
+        paths = sorted(glob.glob(os.path.join(calibration_dir, "*")))[:count]
+        crops = [cv2.imread(path, cv2.IMREAD_GRAYSCALE) for path in paths]
+        crops = [cv2.resize(crop, (48, 48)) for crop in crops if crop is not None]
+        if crops:
+            return (np.stack(crops)[..., None] / 255.0).astype(np.float32)
+    print("No calibration images, using random inputs (int8 accuracy will suffer)")
+    rng = np.random.default_rng(seed)
+    return rng.random((count, 48, 48, 1), dtype=np.float32)
+
+
+def export(keras_path, output_path, quantize, samples):
+    import tensorflow as tf
+    model = tf.keras.models.load_model(keras_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([sample[None]] for sample in samples[:200])
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    with open(output_path, "wb") as file:
+        file.write(converter.convert())
+    print(f"Wrote {output_path} ({os.path.getsize(output_path) / 1024:.0f} KB, {quantize})")
+
+
+def check_parity(keras_path, tflite_path, samples, min_agreement=0.97):
+    """Compare top-1 labels and probabilities of the two backends, returns True if they agree"""
+    import tensorflow as tf
+    keras_probs = np.asarray(tf.keras.models.load_model(keras_path)(samples, training=False))
+    tflite_probs = TFLiteEmotionModel(tflite_path)(samples)
+    agreement = np.mean(np.argmax(keras_probs, axis=1) == np.argmax(tflite_probs, axis=1))
+    max_diff = np.max(np.abs(keras_probs - tflite_probs))
+    print(f"Top-1 agreement {agreement:.1%} over {len(samples)} samples, max probability difference {max_diff:.4f}")
+    return agreement >= min_agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the emotion model to TFLite")
+    parser.add_argument("--keras-model", default=default_keras_model_path())
+    parser.add_argument("--output", default=TFLITE_MODEL_PATH)
+    parser.add_argument("--quantize", choices=["none", "float16", "int8"], default="float16")
+    parser.add_argument("--calibration-dir", help="face crops for int8 calibration and the parity check")
+    parser.add_argument("--min-agreement", type=float, default=0.97, help="required top-1 agreement")
+    parser.add_argument("--check-only", action="store_true", help="skip the export, only compare")
+    args = parser.parse_args()
+
+    samples = load_samples(args.calibration_dir)
+    if not args.check_only:
+        export(args.keras_model, args.output, args.quantize, samples)
+    if not check_parity(args.keras_model, args.output, samples, args.min_agreement):
+        print("FAIL: exported model disagrees with the Keras model")
+        sys.exit(1)
+    print("OK: exported model matches the Keras model")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,141 @@
-import face_recognition
-import dlib
 import numpy as np
 import cv2
 import os
 import csv
 from datetime import datetime
-
-# Initialize face detector
-detector = dlib.get_frontal_face_detector()
+import instrumentation
+from watchlist_index import create_index
+from encoding_snapshot import load_centroids, refresh_snapshot, save_centroids
 
 class FaceRecognizer:
-    def __init__(self, db_manager=None):  # Make db_manager optional
-        self.known_criminals = {}  # name: encoding
+    def __init__(self, db_manager=None, tolerance=0.6, index="exact", snapshot_path=None,
+                 detection_scale=1.0, **index_params):  # Make db_manager optional
+        # criminal ids + (N x 128) encodings; "ivf" trades recall for speed on large watchlists
+        self.index = create_index(index, **index_params)
         self.db_manager = db_manager
+        self.snapshot_path = snapshot_path  # memory-map the watchlist from this file if set
+        self.tolerance = tolerance
+        self.detection_scale = detection_scale  # HOG detection runs on a frame downscaled by this
+        self.change_seq = None  # criminal_changes sequence the loaded watchlist reflects
         self.load_criminals()
+        if self.db_manager and hasattr(self.db_manager, "add_criminal_listener"):
+            self.db_manager.add_criminal_listener(self.on_criminal_changed)
+    
+    def on_criminal_changed(self, action, criminal_id, encoding=None):
+        """Keep the index in sync with database.add_criminal/remove_criminal"""
+        if action == "remove":
+            self.index.remove(criminal_id)
+        elif action == "add" and encoding is not None:
+            self.index.add(criminal_id, encoding)
     
     def load_criminals(self):
         """Load known criminals from database"""
         try:
-            if self.db_manager:  # If using database manager
-                criminals = self.db_manager.get_all_criminals()
-                for criminal in criminals:
-                    if criminal[5]:  # if encoding exists
-                        encoding = np.fromstring(criminal[5][1:-1], sep=',')
-                        self.known_criminals[criminal[1]] = encoding
+            if self.db_manager and self.snapshot_path:  # Shared memory-mapped snapshot
+                snapshot = refresh_snapshot(self.db_manager, self.snapshot_path)
+                if hasattr(self.index, "centroids"):  # IVF: reuse the cells another process trained
+                    centroids = load_centroids(self.snapshot_path, snapshot.change_seq)
+                    self.index.build(snapshot.ids, snapshot.encodings, centroids)
+                    if self.index.is_trained and self.index.centroids is not centroids:
+                        save_centroids(self.snapshot_path, self.index.centroids, snapshot.change_seq)
+                else:
+                    self.index.build(snapshot.ids, snapshot.encodings)
+                self.change_seq = snapshot.change_seq
+            elif self.db_manager:  # If using database manager
+                change_seq = self._current_change_seq()
+                criminal_ids, encodings = self.db_manager.load_criminal_encodings()
+                self.index.build(criminal_ids, encodings)
+                self.change_seq = change_seq
             else:  # Fallback to CSV
+                names, encodings = [], []
                 with open("criminal_database.csv", "r") as file:
                     reader = csv.reader(file)
                     for row in reader:
                         name, encoding_str = row[0], row[1]
-                        encoding = np.fromstring(encoding_str[1:-1], sep=',')
-                        self.known_criminals[name] = encoding
+                        names.append(name)
+                        encodings.append(np.array(encoding_str.strip("[]").replace(",", " ").split(),
+                                                  dtype=np.float32))
+                if names:
+                    self.index.build(names, np.vstack(encodings))
         except FileNotFoundError:
             print("No criminal database found. Starting fresh.")
     
+    def _current_change_seq(self):
+        if hasattr(self.db_manager, "get_criminal_change_seq"):
+            return self.db_manager.get_criminal_change_seq()
+        return None
+    
+    def sync_watchlist(self):
+        """Reload the watchlist if the criminals table changed, e.g. from another process
+        
+        Database listeners only fire in the process that made the change;
+        long-running services call this periodically. Returns True if reloaded.
+        """
+        change_seq = self._current_change_seq()
+        if change_seq is None or change_seq == self.change_seq:
+            return False
+        self.load_criminals()
+        return True
+    
+    def warm_up(self):
+        """Import face_recognition (and dlib's models) ahead of the first frame"""
+        import face_recognition
+    
+    def match_encodings(self, face_encodings, k=1):
+        """Match every face encoding against the whole watchlist in one batch
+        
+        Returns a list with one [(criminal_id, distance), ...] list of the k
+        nearest watchlist entries per face, closest first.
+        """
+        if len(face_encodings) == 0:
+            return []
+        with instrumentation.timer("matching"):
+            ids, distances = self.index.search(np.asarray(face_encodings), k=k)
+        return [list(zip(row_ids, row_dists.tolist())) for row_ids, row_dists in zip(ids, distances)]
+    
+    def encode_faces(self, rgb_frame, face_locations):
+        """Compute encodings for faces at known (top, right, bottom, left) locations"""
+        if not face_locations:
+            return []
+        import face_recognition  # deferred: loads dlib and its model files
+        instrumentation.count("faces_encoded", len(face_locations))
+        with instrumentation.timer("encoding"):
+            return face_recognition.face_encodings(rgb_frame, face_locations)
+    
+    def identify(self, face_encodings):
+        """Return (name, distance) of the closest match per encoding, "Unknown" if none in tolerance"""
+        identities = []
+        for candidates in self.match_encodings(face_encodings):
+            if candidates and candidates[0][1] <= self.tolerance:
+                identities.append(candidates[0])
+            else:
+                identities.append(("Unknown", candidates[0][1] if candidates else None))
+        return identities
+    
     def recognize_faces(self, frame):
         """Detect and recognize faces in a frame"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        face_locations = face_recognition.face_locations(rgb_frame)
-        face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-        detected_names = []
-        
-        for face_encoding in face_encodings:
-            matches = face_recognition.compare_faces(list(self.known_criminals.values()), face_encoding)
-            name = "Unknown"
-            if True in matches:
-                matched_idx = matches.index(True)
-                name = list(self.known_criminals.keys())[matched_idx]
-            detected_names.append(name)
+        import face_recognition
+        with instrumentation.timer("color_conversion"):
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        scale = self.detection_scale
+        with instrumentation.timer("detection"):
+            if scale != 1.0:
+                small = cv2.resize(rgb_frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                # Encode at full resolution from locations mapped back to frame pixels
+                face_locations = [tuple(int(v / scale) for v in location)
+                                  for location in face_recognition.face_locations(small)]
+            else:
+                face_locations = face_recognition.face_locations(rgb_frame)
+        face_encodings = self.encode_faces(rgb_frame, face_locations)
+        detected_names = [name for name, _ in self.identify(face_encodings)]
         
         return detected_names, face_locations
     
     def capture_face_encoding(self, frame):
         """Capture and return face encoding from a frame"""
+        import face_recognition
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         face_encodings = face_recognition.face_encodings(rgb_frame)
         if face_encodings:
             return face_encodings[0]
-        return None
\ No newline at end of file
+        return None
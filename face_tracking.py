@@ -0,0 +1,226 @@
+# face_tracking.py
+import itertools
+import time
+from collections import Counter, OrderedDict, deque
+import cv2
+import numpy as np
+import instrumentation
+from frame_analysis import FaceAnalysis
+
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+class EncodingCache:
+    """Face encodings per track, reused while the track's box stays put
+
+    An entry is a hit when it is younger than ttl seconds and the current
+    box overlaps the box it was computed at by at least min_iou. The least
+    recently used entries are evicted beyond max_entries.
+    """
+
+    def __init__(self, max_entries=256, ttl=2.0, min_iou=0.7):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_iou = min_iou
+        self.entries = OrderedDict()  # track_id -> (box, encoding, time stored)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, track_id, box):
+        """Cached encoding for this track, or None if missing, expired or the box moved"""
+        entry = self.entries.get(track_id)
+        if (entry is None or time.monotonic() - entry[2] > self.ttl or
+                box_iou(entry[0], box) < self.min_iou):
+            self.misses += 1
+            return None
+        self.entries.move_to_end(track_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, track_id, box, encoding):
+        self.entries[track_id] = (box, encoding, time.monotonic())
+        self.entries.move_to_end(track_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def discard(self, track_id):
+        self.entries.pop(track_id, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+class Track:
+    """A face followed across frames"""
+
+    def __init__(self, track_id, box, template):
+        self.track_id = track_id
+        self.box = box
+        self.template = template  # grayscale crop used for template matching
+        self.identity = "Unknown"
+        self.distance = None
+        self.emotion = None
+        self.probabilities = None
+        self.classified_crop = None  # 48x48 crop the current emotion was computed from
+        self.votes = deque()  # (identity, distance) of the last few matches
+
+    def vote(self, identity, distance, window):
+        """Record a match and set the identity to the most frequent of the last window matches"""
+        self.votes.append((identity, distance))
+        while len(self.votes) > window:
+            self.votes.popleft()
+        counts = Counter(name for name, _ in self.votes)
+        best = max(counts.values())
+        # Ties go to the most recent of the leading identities
+        self.identity = next(name for name, _ in reversed(self.votes) if counts[name] == best)
+        self.distance = next(dist for name, dist in reversed(self.votes) if name == self.identity)
+
+    def to_analysis(self):
+        return FaceAnalysis(self.identity, self.distance, self.emotion, self.probabilities, self.box)
+
+
+class FaceTracker:
+    """Detect faces every few frames and follow them with template matching in between
+
+    Emotion is only re-classified when a track's face crop has changed by
+    more than change_threshold (mean absolute 8-bit pixel difference).
+    Identity is re-matched whenever a track's cached encoding expires or
+    its box moves, and voted over the last vote_window fresh matches so the
+    label does not flicker.
+    """
+
+    def __init__(self, analyzer, detect_interval=10, change_threshold=12.0,
+                 search_margin=0.5, min_match_score=0.6, vote_window=5, encoding_cache=None):
+        self.analyzer = analyzer
+        self.detect_interval = detect_interval
+        self.change_threshold = change_threshold
+        self.search_margin = search_margin
+        self.min_match_score = min_match_score
+        self.vote_window = vote_window
+        self.encoding_cache = encoding_cache if encoding_cache is not None else EncodingCache()
+        self.encodings_computed = 0
+        self.tracks = []
+        self.frames_since_detection = detect_interval
+        self.track_ids = itertools.count(1)
+
+    def process(self, frame):
+        """Update tracks for this frame and return one FaceAnalysis per track"""
+        start = time.perf_counter()
+        with instrumentation.timer("color_conversion"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        lost = False
+        if self.tracks and self.frames_since_detection < self.detect_interval:
+            lost = not self._follow(gray)
+        detected = lost or not self.tracks or self.frames_since_detection >= self.detect_interval
+        if detected:
+            instrumentation.count("tracker_detections")
+            self._detect(frame, gray)
+            self.frames_since_detection = 0
+        self.frames_since_detection += 1
+        self._classify_changed(gray)
+        if detected:  # tracked frames are cheap and say nothing about the detection scale
+            self.analyzer.frame_done(time.perf_counter() - start)
+        return [track.to_analysis() for track in self.tracks]
+
+    def reset(self):
+        """Forget all tracks, forcing a detection on the next frame"""
+        self.tracks = []
+        self.frames_since_detection = self.detect_interval
+        self.encoding_cache.clear()
+
+    def metrics(self):
+        """Encoding cache counters and the number of encodings actually computed"""
+        return dict(self.encoding_cache.stats(), encodings_computed=self.encodings_computed)
+
+    def _detect(self, frame, gray):
+        """Run the detector and match its boxes to existing tracks by overlap"""
+        boxes = self.analyzer.detect_faces(gray)
+        previous = self.tracks
+        self.tracks = []
+        for box in boxes:
+            best = max(previous, key=lambda track: box_iou(track.box, box), default=None)
+            if best is not None and box_iou(best.box, box) > 0.3:
+                previous.remove(best)
+                best.box = box
+                best.template = _crop(gray, box).copy()
+                self.tracks.append(best)
+            else:
+                self.tracks.append(Track(next(self.track_ids), box, _crop(gray, box).copy()))
+        for track in previous:  # lost tracks
+            self.encoding_cache.discard(track.track_id)
+        if self.tracks:
+            self._identify(frame)
+
+    def _identify(self, frame):
+        """Encode and match tracks without a usable cached encoding
+        
+        Tracks whose cached encoding still applies keep their label; only
+        fresh encodings are matched and voted on, so a repeated cached
+        encoding cannot fill the voting window by itself.
+        """
+        stale = [track for track in self.tracks
+                 if self.encoding_cache.get(track.track_id, track.box) is None]
+        if not stale:
+            return
+        encodings = self.analyzer.encode(frame, [track.box for track in stale])
+        self.encodings_computed += len(stale)
+        for track, encoding in zip(stale, encodings):
+            self.encoding_cache.put(track.track_id, track.box, encoding)
+        identities = self.analyzer.face_recognizer.identify(encodings)
+        for track, (identity, distance) in zip(stale, identities):
+            track.vote(identity, distance, self.vote_window)
+
+    def _follow(self, gray):
+        """Move every track to its best template match, returns False if one was lost"""
+        frame_h, frame_w = gray.shape[:2]
+        for track in self.tracks:
+            x, y, w, h = track.box
+            mx, my = int(w * self.search_margin), int(h * self.search_margin)
+            x0, y0 = max(0, x - mx), max(0, y - my)
+            x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+            window = gray[y0:y1, x0:x1]
+            if window.shape[0] < h or window.shape[1] < w:
+                return False
+            scores = cv2.matchTemplate(window, track.template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+            if score < self.min_match_score:
+                return False
+            track.box = (x0 + dx, y0 + dy, w, h)
+            track.template = _crop(gray, track.box).copy()
+        return True
+
+    def _classify_changed(self, gray):
+        """Re-run emotion inference only for tracks whose crop changed meaningfully"""
+        stale = []
+        for track in self.tracks:
+            crop = cv2.resize(_crop(gray, track.box), (48, 48))
+            if (track.classified_crop is None or
+                    np.mean(cv2.absdiff(crop, track.classified_crop)) > self.change_threshold):
+                track.classified_crop = crop
+                stale.append(track)
+        if not stale:
+            return
+        probabilities = self.analyzer.classify(gray, [track.box for track in stale])
+        labels = self.analyzer.emotion_detector.emotion_labels
+        for track, probs in zip(stale, probabilities):
+            track.probabilities = probs
+            track.emotion = labels[int(np.argmax(probs))]
+
+
+def _crop(gray, box):
+    x, y, w, h = box
+    return gray[y:y+h, x:x+w]
@@ -0,0 +1,71 @@
+# frame_analysis.py
+import time
+from collections import namedtuple
+import cv2
+import numpy as np
+import instrumentation
+
+# One combined result per face; box is (x, y, w, h) in frame pixels
+FaceAnalysis = namedtuple("FaceAnalysis", ["identity", "distance", "emotion", "probabilities", "box"])
+
+
+def box_to_location(box):
+    """Convert an (x, y, w, h) box to face_recognition's (top, right, bottom, left)"""
+    x, y, w, h = box
+    return (y, x + w, y + h, x)
+
+
+class FrameAnalyzer:
+    """Single detection pass feeding both face recognition and emotion detection"""
+
+    def __init__(self, face_recognizer, emotion_detector, scheduler=None, detector=None):
+        self.face_recognizer = face_recognizer
+        self.emotion_detector = emotion_detector
+        self.scheduler = scheduler  # optional shared BatchScheduler for emotion inference
+        self.detector = detector  # optional per-stream AdaptiveDetector (scale tuning, motion ROI)
+
+    def analyze(self, frame):
+        """Convert and detect once, then identify and classify every face"""
+        start = time.perf_counter()
+        with instrumentation.timer("color_conversion"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        boxes = self.detect_faces(gray)
+        faces = self.analyze_boxes(frame, gray, boxes) if boxes else []
+        self.frame_done(time.perf_counter() - start)
+        return faces
+
+    def detect_faces(self, gray):
+        """Face boxes in frame pixels, through the adaptive detector if set"""
+        if self.detector is not None:
+            return self.detector.detect(gray)
+        return self.emotion_detector.detect_faces(gray)
+
+    def frame_done(self, seconds):
+        """Report one frame's processing time so the detection scale can adapt"""
+        if self.detector is not None:
+            self.detector.frame_done(seconds)
+
+    def analyze_boxes(self, frame, gray, boxes):
+        """Identify and classify faces at already known boxes"""
+        identities = self.identify(frame, boxes)
+        probabilities = self.classify(gray, boxes)
+        labels = self.emotion_detector.emotion_labels
+        return [FaceAnalysis(identity, distance, labels[int(np.argmax(probs))], probs, box)
+                for (identity, distance), probs, box in zip(identities, probabilities, boxes)]
+
+    def encode(self, frame, boxes):
+        """Face encodings for each box, computed in one call"""
+        with instrumentation.timer("color_conversion"):
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return self.face_recognizer.encode_faces(rgb, [box_to_location(box) for box in boxes])
+
+    def identify(self, frame, boxes):
+        """(identity, distance) for each box"""
+        return self.face_recognizer.identify(self.encode(frame, boxes))
+
+    def classify(self, gray, boxes):
+        """Emotion probabilities for each box, batched through the scheduler if set"""
+        batch = self.emotion_detector.preprocess_faces(gray, boxes)
+        if self.scheduler is not None:
+            return [future.result() for future in self.scheduler.submit_many(batch)]
+        return self.emotion_detector.classify_faces(batch)
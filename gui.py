@@ -3,21 +3,149 @@ from tkinter import ttk, messagebox, filedialog
 import cv2
 from PIL import Image, ImageTk
 import database
+import instrumentation
 from face_recognition_module import FaceRecognizer
+from encoding_snapshot import DEFAULT_SNAPSHOT_PATH
 from emotion_detection import EmotionDetector
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from frame_analysis import FrameAnalyzer
+from face_tracking import FaceTracker
+from adaptive_detection import AdaptiveDetector
+from video_pipeline import VideoPipeline
+from stream_manager import parse_source
+from recognition_service import RecognitionClient
 import os
+import threading
 import time
-from datetime import datetime
+from collections import deque
+
+class PagedCriminalList:
+    """Shows database.search_criminals results in a Treeview a page at a time
+    
+    At most max_pages pages are kept in the widget: scrolling near the
+    bottom fetches the next page and drops the top one, scrolling near the
+    top fetches the previous page back and drops the bottom one. Large
+    tables open instantly and the tree never grows past a few hundred
+    rows; the scrollbar shows the position within the loaded window.
+    """
+    
+    def __init__(self, tree, scrollbar, page_size=200, max_pages=3):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.query = ""
+        self.pages = deque()  # (first criminal_id, last criminal_id, item ids) in criminal_id order
+        self.at_start = True  # the first loaded page is the first matching page
+        self.at_end = False  # the last loaded page is the last matching page
+        self.pending = False  # a page load is scheduled
+        tree.configure(yscrollcommand=self.on_scroll)
+        scrollbar.configure(command=tree.yview)
+    
+    def reset(self, query=""):
+        """Clear the list and load the first page matching query"""
+        self.tree.delete(*self.tree.get_children())
+        self.query = query
+        self.pages.clear()
+        self.at_start, self.at_end = True, False
+        self.load_next_page()
+    
+    def _insert_page(self, criminals, index):
+        items = [self.tree.insert("", index if index == "end" else index + i,
+                                  values=(criminal[4], criminal[1], criminal[2], criminal[3]))
+                 for i, criminal in enumerate(criminals)]
+        return (criminals[0][4], criminals[-1][4], items)
+    
+    def _first_visible(self):
+        children = self.tree.get_children()
+        return children[min(len(children) - 1, int(self.tree.yview()[0] * len(children)))] if children else None
+    
+    def _keep_in_view(self, item):
+        """Scroll back to item after rows above it were added or removed"""
+        if item is not None and self.tree.exists(item):
+            self.tree.yview_moveto(self.tree.index(item) / len(self.tree.get_children()))
+    
+    def load_next_page(self):
+        self.pending = False
+        if self.at_end:
+            return
+        after = self.pages[-1][1] if self.pages else None
+        criminals = database.search_criminals(self.query, after=after, limit=self.page_size)
+        self.at_end = len(criminals) < self.page_size
+        if not criminals:
+            return
+        anchor = self._first_visible()
+        self.pages.append(self._insert_page(criminals, "end"))
+        if len(self.pages) > self.max_pages:
+            self.tree.delete(*self.pages.popleft()[2])
+            self.at_start = False
+            self._keep_in_view(anchor)
+    
+    def load_previous_page(self):
+        self.pending = False
+        if self.at_start or not self.pages:
+            return
+        criminals = database.search_criminals(self.query, before=self.pages[0][0], limit=self.page_size)
+        self.at_start = len(criminals) < self.page_size
+        if not criminals:
+            return
+        anchor = self._first_visible()
+        self.pages.appendleft(self._insert_page(criminals, 0))
+        if len(self.pages) > self.max_pages:
+            self.tree.delete(*self.pages.pop()[2])
+            self.at_end = False
+        self._keep_in_view(anchor)
+    
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self.pending:
+            return
+        if float(last) > 0.9 and not self.at_end:
+            self.pending = True
+            self.tree.after_idle(self.load_next_page)
+        elif float(first) < 0.1 and not self.at_start:
+            self.pending = True
+            self.tree.after_idle(self.load_previous_page)
 
 class MainGUI:
     def __init__(self, current_user):
         self.current_user = current_user
-        self.face_recognizer = FaceRecognizer()
-        self.emotion_detector = EmotionDetector()
+        self.face_recognizer = self.emotion_detector = self.frame_analyzer = None
+        self.models_ready = threading.Event()
+        self.model_error = None
         self.app = tk.Tk()
+        instrumentation.start_export()
         self.setup_main_window()
+        # Show the window now; the models are usually ready before "Start Detection" is clicked
+        threading.Thread(target=self.load_models, name="model-warmup", daemon=True).start()
+    
+    def load_models(self):
+        """Load and warm the recognition and emotion models off the Tk thread"""
+        try:
+            service_url = os.environ.get("NCA_SERVICE_URL")
+            if service_url:
+                # Thin client: models and watchlist live in recognition_service.py
+                self.frame_analyzer = RecognitionClient(service_url)
+            else:
+                face_recognizer = FaceRecognizer(database, snapshot_path=DEFAULT_SNAPSHOT_PATH)
+                emotion_detector = EmotionDetector()
+                face_recognizer.warm_up()
+                emotion_detector.warm_up()
+                self.face_recognizer, self.emotion_detector = face_recognizer, emotion_detector
+                self.frame_analyzer = FrameAnalyzer(face_recognizer, emotion_detector)
+        except Exception as e:
+            self.model_error = e
+        finally:
+            self.models_ready.set()
+    
+    def when_models_ready(self, callback):
+        """Run callback on the Tk thread once load_models has finished"""
+        if not self.models_ready.is_set():
+            self.app.after(100, self.when_models_ready, callback)
+            return
+        if self.model_error:
+            messagebox.showerror("Error", f"Could not load models: {self.model_error}")
+            return
+        callback()
         
     def setup_main_window(self):
         """Setup the main application window"""
@@ -58,7 +186,7 @@ class MainGUI:
                 messagebox.showerror("Error", "Criminal ID is required!")
                 return
             user_id_window.destroy()
-            self.run_facial_recognition(criminal_id)
+            self.when_models_ready(lambda: self.run_facial_recognition(criminal_id))
         
         tk.Button(user_id_window, text="Start Detection", command=submit_user_id).place(x=100, y=60)
     
@@ -74,19 +202,56 @@ class MainGUI:
         emotion_text = tk.Label(sdt, text="Emotion: ", font=("Arial", 16))
         emotion_text.place(x=80, y=540)
         
-        cap = cv2.VideoCapture(0)
+        stats_text = tk.Label(sdt, text="", font=("Arial", 9))
+        stats_text.place(x=480, y=545)
+        
+        # NCA_CAMERA_SOURCE: device index, video file or stream URL (default: first webcam)
+        cap = cv2.VideoCapture(parse_source(os.environ.get("NCA_CAMERA_SOURCE", "0")))
+        # Full detection every few frames only; the remote service analyses every frame it gets
+        tracker = None
+        if self.emotion_detector:
+            # Per-session detector state: motion history and the auto-tuned detection scale
+            detector = AdaptiveDetector.from_env(self.emotion_detector)
+            tracker = FaceTracker(FrameAnalyzer(self.face_recognizer, self.emotion_detector, detector=detector))
+        
+        def process_frame(frame):
+            """Runs on the inference worker, off the Tk main loop"""
+            faces = tracker.process(frame) if tracker else self.frame_analyzer.analyze(frame)
+            if faces:
+                # Log the suspect's face if recognized, otherwise the first face as before
+                subject = next((face for face in faces if face.identity == criminal_id), faces[0])
+                database.log_emotion(criminal_id, subject.emotion)
+            return faces
+        
+        pipeline = VideoPipeline(cap, process_frame).start()
         start_time = time.time()
+        closed = False
+        show_profile = False
+        
+        def toggle_profile(event=None):
+            nonlocal show_profile
+            show_profile = not show_profile
+        sdt.bind("<F2>", toggle_profile)  # per-stage p50/p95/p99 over the video
         
         def update_webcam():
-            ret, frame = cap.read()
-            if ret:
-                emotion, face_coords = self.emotion_detector.detect_emotion(frame)
-                if emotion and face_coords:
-                    x, y, w, h = face_coords
+            if closed:
+                return
+            frame = pipeline.latest_frame()
+            if frame is not None:
+                render_start = time.perf_counter()
+                frame = frame.copy()
+                faces = pipeline.latest_result() or []
+                for face in faces:
+                    x, y, w, h = face.box
+                    label = face.emotion if face.identity == "Unknown" else f"{face.identity}: {face.emotion}"
                     cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                    cv2.putText(frame, emotion, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                    emotion_text.config(text=f"Emotion: {emotion}")
-                    database.log_emotion(criminal_id, emotion)
+                    cv2.putText(frame, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                if faces:
+                    subject = next((face for face in faces if face.identity == criminal_id), faces[0])
+                    emotion_text.config(text=f"Emotion: {subject.emotion}")
+                if show_profile:
+                    for i, line in enumerate(instrumentation.overlay_lines()):
+                        cv2.putText(frame, line, (10, 20 + 18 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
                 
                 frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 img = Image.fromarray(frame)
@@ -94,15 +259,34 @@ class MainGUI:
                 imgtk = ImageTk.PhotoImage(image=img)
                 video_label.imgtk = imgtk
                 video_label.config(image=imgtk)
+                render_seconds = time.perf_counter() - render_start
+                pipeline.stats.record("render", render_seconds)
+                instrumentation.record("render", render_seconds)
+                pipeline.stats.tick("render")
+                
+                metrics = pipeline.metrics()
+                latency = metrics["latency_ms"]
+                stats = (f"{metrics['fps'].get('render', 0):.0f} fps | "
+                         f"inference {latency.get('inference', 0):.0f} ms | "
+                         f"render {latency.get('render', 0):.0f} ms")
+                if tracker:
+                    stats += (f" | encoding cache {tracker.metrics()['hit_rate']:.0%}"
+                              f" | scale {detector.scale:g}")
+                stats_text.config(text=stats)
             
             elapsed_time = time.time() - start_time
             if elapsed_time < 60:
-                video_label.after(30, update_webcam)
+                video_label.after(15, update_webcam)
             else:
                 close_webcam()
         
         def close_webcam():
-            cap.release()
+            nonlocal closed
+            if closed:
+                return
+            closed = True
+            pipeline.stop()  # also releases cap once its capture thread is out of read()
+            database.flush_emotion_logs()
             sdt.destroy()
             messagebox.showinfo("Complete", "1 minute of emotion data collected!")
         
@@ -178,20 +362,12 @@ class MainGUI:
         logs_window.title("Criminal Logs")
         logs_window.geometry("600x400")
         
-        tk.Label(logs_window, text="Search Criminal ID:").place(x=20, y=20)
+        tk.Label(logs_window, text="Search ID/Name/Crime:").place(x=20, y=20)
         search_entry = tk.Entry(logs_window)
         search_entry.place(x=150, y=20)
         
         def search_criminal():
-            criminal_id = search_entry.get()
-            update_criminal_list(criminal_id)
-        
-        def update_criminal_list(search_id=None):
-            for row in tree.get_children():
-                tree.delete(row)
-            criminals = database.get_all_criminals() if not search_id else [c for c in database.get_all_criminals() if c[4] == search_id]
-            for criminal in criminals:
-                tree.insert("", "end", values=(criminal[4], criminal[1], criminal[2], criminal[3]))
+            criminal_list.reset(search_entry.get().strip())
         
         def on_criminal_select(event):
             selected_item = tree.selection()[0]
@@ -220,11 +396,18 @@ class MainGUI:
             tree.heading(col, text=col)
         tree.place(x=20, y=60, width=550, height=300)
         tree.bind("<Double-1>", on_criminal_select)
+        scrollbar = ttk.Scrollbar(logs_window, orient=tk.VERTICAL)
+        scrollbar.place(x=570, y=60, height=300)
+        search_entry.bind("<Return>", lambda event: search_criminal())
         
-        update_criminal_list()
+        criminal_list = PagedCriminalList(tree, scrollbar)
+        criminal_list.reset()
     
     def emotion_graphs_tab(self):
         """Display emotion graphs for selected criminals"""
+        from matplotlib.figure import Figure  # matplotlib is only needed for this window
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        
         graphs_window = tk.Toplevel(self.app)
         graphs_window.title("Emotion Analysis")
         graphs_window.geometry("800x600")
@@ -240,7 +423,10 @@ class MainGUI:
         self.criminal_tree = ttk.Treeview(selection_frame, columns=columns, show='headings')
         for col in columns:
             self.criminal_tree.heading(col, text=col)
+        tree_scrollbar = ttk.Scrollbar(selection_frame, orient=tk.VERTICAL)
+        tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.criminal_tree.pack(fill=tk.BOTH, expand=True)
+        criminal_list = PagedCriminalList(self.criminal_tree, tree_scrollbar)
         
         # Graph display frame
         graph_frame = tk.Frame(graphs_window)
@@ -250,13 +436,60 @@ class MainGUI:
         conclusion_label = tk.Label(graphs_window, text="Conclusion: ", font=("Arial", 12))
         conclusion_label.place(x=20, y=570)
         
+        # Emotion color mapping and numerical values for plotting
+        emotion_values = {
+            'Angry': 4,
+            'Disgust': 3,
+            'Fear': 2,
+            'Happy': 1,
+            'Sad': 4,
+            'Surprise': 2,
+            'Neutral': 0
+        }
+        
+        # One figure per window, updated in place for every selection and zoom
+        fig = Figure(figsize=(12, 6))
+        ax = fig.add_subplot()
+        line, = ax.plot([], [], color='blue', linewidth=2, marker='o', markersize=4,
+                        markerfacecolor='red')
+        ax.set_xlabel("Time (seconds)", fontsize=12)
+        ax.set_ylabel("Emotion Intensity", fontsize=12)
+        ax.set_yticks(list(emotion_values.values()))
+        ax.set_yticklabels(list(emotion_values.keys()))
+        ax.set_ylim(-0.5, 4.5)
+        ax.grid(True, linestyle='--', alpha=0.7)
+        canvas = FigureCanvasTkAgg(fig, master=graph_frame)
+        NavigationToolbar2Tk(canvas, graph_frame)  # zoom/pan re-queries the visible window
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        
+        plot_state = {"criminal_id": None, "first_ms": 0, "updating": False, "pending": False}
+        
+        def plot_window(start_ms, end_ms):
+            """Draw the downsampled series for the visible time window"""
+            series = database.get_emotion_series(plot_state["criminal_id"], int(start_ms), int(end_ms))
+            line.set_data([(ts - plot_state["first_ms"]) / 1000.0 for ts, _, _ in series],
+                          [emotion_values[emotion] for _, emotion, _ in series])
+            canvas.draw_idle()
+        
+        def refresh_visible_window():
+            plot_state["pending"] = False
+            if plot_state["criminal_id"] is None:
+                return
+            low, high = ax.get_xlim()
+            plot_window(plot_state["first_ms"] + low * 1000, plot_state["first_ms"] + high * 1000)
+        
+        def on_xlim_changed(axes):
+            # Pan/zoom fires this repeatedly; query once the UI is idle
+            if plot_state["updating"] or plot_state["pending"]:
+                return
+            plot_state["pending"] = True
+            graphs_window.after_idle(refresh_visible_window)
+        
+        ax.callbacks.connect('xlim_changed', on_xlim_changed)
+        
         def load_criminals():
-            """Load all criminals into the treeview"""
-            for row in self.criminal_tree.get_children():
-                self.criminal_tree.delete(row)
-            criminals = database.get_all_criminals()
-            for criminal in criminals:
-                self.criminal_tree.insert("", "end", values=(criminal[4], criminal[1], criminal[2], criminal[3]))
+            """Load the first page of criminals into the treeview"""
+            criminal_list.reset()
         
         def on_criminal_select(event):
             """Handle criminal selection and display their emotion graph"""
@@ -268,83 +501,33 @@ class MainGUI:
             criminal = database.get_criminal_by_id(criminal_id)
             if not criminal:
                 return
-                
-            # Get emotion logs
-            logs = database.get_emotion_logs(criminal_id)
-
-            # Clear previous graph and conclusion
-            for widget in graph_frame.winfo_children():
-                widget.destroy()
-            conclusion_label.config(text="Conclusion: ")
-
-            if not logs:
-                tk.Label(graph_frame, text="No emotion data available for this criminal").pack()
-                return
-
-            # Prepare data for plotting
-            timestamps = [log[0] for log in logs]
-            emotions = [log[1] for log in logs]
-
+            
             try:
-                # Convert timestamps to relative time in seconds
-                first_time = datetime.strptime(timestamps[0], '%Y-%m-%d %H:%M:%S')
-                time_deltas = [(datetime.strptime(ts, '%Y-%m-%d %H:%M:%S') - first_time).total_seconds() 
-                              for ts in timestamps]
-                
-                # Create the plot with larger figure size
-                fig, ax = plt.subplots(figsize=(12, 6))
-                
-                # Emotion color mapping and numerical values for plotting
-                emotion_values = {
-                    'Angry': 4,
-                    'Disgust': 3,
-                    'Fear': 2,
-                    'Happy': 1,
-                    'Sad': 4,
-                    'Surprise': 2,
-                    'Neutral': 0
-                }
-                
-                # Convert emotions to numerical values
-                y_values = [emotion_values[e] for e in emotions]
+                log_range = database.get_emotion_log_range(criminal_id)
+                plot_state["criminal_id"] = criminal_id if log_range else None
+                conclusion_label.config(text="Conclusion: ")
+                if not log_range:
+                    line.set_data([], [])
+                    ax.set_title("No emotion data available for this criminal", fontsize=14, pad=20)
+                    canvas.draw_idle()
+                    return
                 
-                # Create a line plot that shows emotional transitions
-                ax.plot(time_deltas, y_values, 
-                       color='blue', 
-                       linewidth=2, 
-                       marker='o',
-                       markersize=8,
-                       markerfacecolor='red',
-                       markeredgewidth=2)
-                
-                # Add emotion labels at each point
-                for i, (x, y, emotion) in enumerate(zip(time_deltas, y_values, emotions)):
-                    ax.text(x, y+0.1, emotion, ha='center', va='bottom', fontsize=10)
-                
-                # Customize the plot
-                ax.set_xlabel("Time (seconds)", fontsize=12)
-                ax.set_ylabel("Emotion Intensity", fontsize=12)
+                first_ms, last_ms = log_range
+                plot_state["first_ms"] = first_ms
                 ax.set_title(f"Emotional Variation for {criminal[1]}", fontsize=14, pad=20)
+                plot_state["updating"] = True
+                try:
+                    ax.set_xlim(0, max((last_ms - first_ms) / 1000.0, 1.0))
+                finally:
+                    plot_state["updating"] = False
+                plot_window(first_ms, last_ms)
                 
-                # Set y-axis to show emotion names
-                ax.set_yticks(list(emotion_values.values()))
-                ax.set_yticklabels(list(emotion_values.keys()))
-                ax.grid(True, linestyle='--', alpha=0.7)
-                
-                # Calculate conclusion
-                negative_emotions = ['Angry', 'Disgust', 'Fear', 'Sad']
-                negative_count = sum(1 for e in emotions if e in negative_emotions)
-                total = len(emotions)
-                conclusion = "Confirmed suspect" if (negative_count/total) > 0.5 else "Innocent civilian"
+                # Conclusion from the running per-criminal totals
+                conclusion, negative_count, total = EmotionDetector.emotion_conclusion(criminal_id)
                 conclusion_label.config(text=f"Conclusion: {conclusion} (Negative: {negative_count}/{total})")
                 
-                # Embed the plot
-                canvas = FigureCanvasTkAgg(fig, master=graph_frame)
-                canvas.draw()
-                canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-                
             except Exception as e:
-                tk.Label(graph_frame, text=f"Error generating graph: {str(e)}").pack()
+                conclusion_label.config(text=f"Error generating graph: {str(e)}")
         
         # Bind selection event
         self.criminal_tree.bind("<<TreeviewSelect>>", on_criminal_select)
@@ -0,0 +1,98 @@
+# inference_scheduler.py
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+import numpy as np
+
+
+class BatchScheduler:
+    """Collect single inputs from many callers and run them as micro-batches
+
+    A batch is flushed once it holds max_batch_size items or the oldest
+    queued item has waited max_delay seconds, whichever comes first.
+    """
+
+    def __init__(self, infer_fn, max_batch_size=32, max_delay=0.010):
+        self.infer_fn = infer_fn
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.queue = deque()  # (enqueue_time, item, future)
+        self.condition = threading.Condition()
+        self.batch_sizes = Counter()
+        self.running = True
+        self.worker = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self.worker.start()
+
+    def submit(self, item):
+        """Queue one input, returns a Future with its row of the model output"""
+        future = Future()
+        with self.condition:
+            if not self.running:
+                raise RuntimeError("BatchScheduler is closed")
+            self.queue.append((time.monotonic(), item, future))
+            self.condition.notify()
+        return future
+
+    def submit_many(self, items):
+        """Queue several inputs, returns one Future per input"""
+        return [self.submit(item) for item in items]
+
+    def queue_depth(self):
+        """Number of inputs waiting for a batch"""
+        with self.condition:
+            return len(self.queue)
+
+    def stats(self):
+        """Queue depth and a histogram of flushed batch sizes"""
+        with self.condition:
+            return {
+                "queue_depth": len(self.queue),
+                "batches": sum(self.batch_sizes.values()),
+                "items": sum(size * count for size, count in self.batch_sizes.items()),
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            }
+
+    def close(self):
+        """Flush what is queued and stop the worker thread"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.worker.join()
+
+    def _next_batch(self):
+        """Block until a batch is due, returns [] once closed and drained"""
+        with self.condition:
+            while self.running and not self.queue:
+                self.condition.wait()
+            while self.running and len(self.queue) < self.max_batch_size:
+                remaining = self.queue[0][0] + self.max_delay - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            count = min(len(self.queue), self.max_batch_size)
+            batch = [self.queue.popleft() for _ in range(count)]
+            if batch:
+                self.batch_sizes[len(batch)] += 1
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            # Skip inputs whose caller cancelled; the rest can no longer be cancelled
+            batch = [entry for entry in batch if entry[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            futures = [future for _, _, future in batch]
+            try:
+                outputs = self.infer_fn(np.stack([item for _, item, _ in batch]))
+                if len(outputs) != len(batch):
+                    raise ValueError(f"infer_fn returned {len(outputs)} rows for a batch of {len(batch)}")
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, output in zip(futures, outputs):
+                future.set_result(output)
@@ -0,0 +1,178 @@
+# instrumentation.py
+"""Always-on stage timers and counters with percentile export
+
+    with instrumentation.timer("detection"):
+        boxes = detector.detect_faces(gray)
+    instrumentation.count("db_rows", len(rows))
+
+Each stage keeps its last `window` durations in a ring buffer (a deque
+append per sample, no locks), so timing costs about a microsecond.
+start_export() writes p50/p95/p99 per stage to a rotating JSON-lines file
+(NCA_METRICS_PATH, default nca_metrics.jsonl) every few seconds.
+NCA_INSTRUMENTATION=0 turns every timer into a no-op.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+
+ENABLED = os.environ.get("NCA_INSTRUMENTATION", "1") != "0"
+METRICS_PATH = os.environ.get("NCA_METRICS_PATH", "nca_metrics.jsonl")
+PERCENTILES = (50, 95, 99)
+
+_window = 2048
+_samples = {}  # stage -> deque of seconds
+_totals = {}  # stage -> samples recorded since start
+_counters = {}  # name -> running total
+_lock = threading.Lock()  # only taken to create a stage or counter
+
+
+def _stage(stage):
+    samples = _samples.get(stage)
+    if samples is None:
+        with _lock:
+            samples = _samples.setdefault(stage, deque(maxlen=_window))
+            _totals.setdefault(stage, 0)
+    return samples
+
+
+def record(stage, seconds):
+    """Add one duration sample to a stage"""
+    _stage(stage).append(seconds)
+    _totals[stage] = _totals.get(stage, 0) + 1  # may undercount under contention, samples are exact
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(stage):
+    """Context manager recording the duration of its block under stage"""
+    return _Timer(stage) if ENABLED else _NULL_TIMER
+
+
+def count(name, amount=1):
+    """Add amount to a running counter"""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def percentiles(values, quantiles=PERCENTILES):
+    """Nearest-rank percentiles of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {q: ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] for q in quantiles}
+
+
+def snapshot():
+    """Per-stage count, mean and p50/p95/p99 in milliseconds over the recent window, plus counters"""
+    stages = {}
+    for stage, samples in list(_samples.items()):
+        values = list(samples)
+        if not values:
+            continue
+        stats = {"count": _totals.get(stage, len(values)), "mean_ms": 1000 * sum(values) / len(values)}
+        stats.update({f"p{q}_ms": 1000 * value for q, value in percentiles(values).items()})
+        stages[stage] = stats
+    with _lock:
+        counters = dict(_counters)
+    return {"stages": stages, "counters": counters}
+
+
+def overlay_lines(stages=None):
+    """Short "stage p50/p95/p99 ms" lines for drawing over the video"""
+    lines = []
+    for stage, stats in sorted(snapshot()["stages"].items()):
+        if stages is None or stage in stages:
+            lines.append(f"{stage} {stats['p50_ms']:.1f}/{stats['p95_ms']:.1f}/{stats['p99_ms']:.1f} ms")
+    return lines
+
+
+def reset():
+    """Forget all samples and counters"""
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        _counters.clear()
+
+
+class _Exporter:
+    """Background thread appending one snapshot per interval to a rotating JSON-lines file"""
+
+    def __init__(self, path, interval, max_bytes, backups):
+        self.interval = interval
+        self.logger = logging.getLogger("nca.metrics")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.addHandler(self.handler)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+        self.thread.start()
+
+    def write(self):
+        data = snapshot()
+        if data["stages"] or data["counters"]:
+            self.logger.info(json.dumps(dict(data, time=round(time.time(), 3), pid=os.getpid())))
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.write()
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+
+_exporter = None
+
+
+def start_export(path=METRICS_PATH, interval=10.0, max_bytes=5 * 1024 * 1024, backups=3):
+    """Start writing snapshots to path every interval seconds (once per process)"""
+    global _exporter
+    with _lock:
+        if ENABLED and _exporter is None:
+            _exporter = _Exporter(path, interval, max_bytes, backups)
+
+
+@atexit.register
+def stop_export():
+    """Write a final snapshot and stop the exporter"""
+    global _exporter
+    with _lock:
+        exporter, _exporter = _exporter, None
+    if exporter is not None:
+        exporter.stop()
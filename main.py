@@ -1,11 +1,11 @@
 # main.py
 from authentication import show_login_window
-from gui import MainGUI
 import database  # Import the module, not DatabaseManager
 
 def launch_main_gui(officer):
     """Launch the main GUI after successful login"""
-    app = MainGUI(officer)  # No db_manager needed
+    from gui import MainGUI  # imported after login so the login window opens immediately
+    app = MainGUI(officer)  # No db_manager needed; models load in the background
     app.run()
 
 if __name__ == "__main__":
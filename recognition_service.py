@@ -0,0 +1,280 @@
+# recognition_service.py
+"""Long-running recognition service shared by the GUI and batch tools
+
+    python recognition_service.py --port 8765
+    python recognition_service.py --unix /tmp/nca.sock
+
+Loads the watchlist and emotion model once and answers:
+    POST /analyze   body: one JPEG (image/jpeg) or {"frames": [base64 JPEG, ...]}
+    GET  /health    queue and concurrency counters
+
+Requests beyond --max-pending are rejected with 503 so callers back off
+instead of piling up latency.
+"""
+import argparse
+import asyncio
+import base64
+import http.client
+import json
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import cv2
+import numpy as np
+import instrumentation
+from frame_analysis import FaceAnalysis
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+def face_to_json(face):
+    return {
+        "identity": face.identity,
+        "distance": None if face.distance is None else float(face.distance),
+        "emotion": face.emotion,
+        "probabilities": None if face.probabilities is None else [float(p) for p in face.probabilities],
+        "box": [int(v) for v in face.box],
+    }
+
+
+def face_from_json(data):
+    return FaceAnalysis(data["identity"], data["distance"], data["emotion"],
+                        None if data["probabilities"] is None else np.asarray(data["probabilities"]),
+                        tuple(data["box"]))
+
+
+class RecognitionService:
+    """asyncio HTTP front end over one warm FrameAnalyzer"""
+
+    def __init__(self, analyzer, max_concurrency=4, max_pending=32, watchlist_poll=5.0):
+        self.analyzer = analyzer
+        self.watchlist_poll = watchlist_poll  # seconds between checks for criminals changed elsewhere
+        self.executor = ThreadPoolExecutor(max_concurrency, thread_name_prefix="analyze")
+        self.max_pending = max_pending
+        self.pending = 0
+        self.served = 0
+        self.rejected = 0
+
+    def analyze_jpegs(self, jpegs):
+        """Decode and analyse JPEG frames (runs on the executor)"""
+        results = []
+        for jpeg in jpegs:
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError("could not decode image")
+            results.append([face_to_json(face) for face in self.analyzer.analyze(frame)])
+        return results
+
+    def health(self):
+        stats = {"pending": self.pending, "max_pending": self.max_pending,
+                 "served": self.served, "rejected": self.rejected}
+        if self.analyzer.scheduler is not None:
+            stats["emotion_batches"] = self.analyzer.scheduler.stats()
+        stats["stages"] = instrumentation.snapshot()["stages"]
+        return stats
+
+    async def handle_analyze(self, headers, body):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            return 503, {"error": "overloaded, retry later"}
+        if headers.get("content-type", "").startswith("application/json"):
+            jpegs = [base64.b64decode(frame) for frame in json.loads(body)["frames"]]
+        else:
+            jpegs = [body]
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self.executor, self.analyze_jpegs, jpegs)
+        finally:
+            self.pending -= 1
+        self.served += len(jpegs)
+        return 200, {"results": results}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split(" ", 2)
+                if len(parts) != 3:
+                    await self.respond(writer, 400, {"error": "malformed request line"}, close=True)
+                    break
+                method, path, _ = parts
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, {"error": "invalid Content-Length"}, close=True)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {"error": "request too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    if method == "POST" and path == "/analyze":
+                        status, payload = await self.handle_analyze(headers, body)
+                    elif method == "GET" and path == "/health":
+                        status, payload = 200, self.health()
+                    else:
+                        status, payload = 404, {"error": "not found"}
+                except (ValueError, KeyError) as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception as e:  # never drop the connection without an answer
+                    print(f"Request {method} {path} failed: {e!r}")
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                close = headers.get("connection", "").lower() == "close"
+                await self.respond(writer, status, payload, close)
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, close=False):
+        body = json.dumps(payload).encode()
+        reason = http.client.responses.get(status, "")
+        headers = [f"HTTP/1.1 {status} {reason}", "Content-Type: application/json",
+                   f"Content-Length: {len(body)}", f"Connection: {'close' if close else 'keep-alive'}"]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def poll_watchlist(self):
+        """Reload the watchlist when the GUI or bulk_enroll.py changed the criminals table"""
+        recognizer = getattr(self.analyzer, "face_recognizer", None)
+        if recognizer is None or not hasattr(recognizer, "sync_watchlist"):
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.watchlist_poll)
+            try:
+                if await loop.run_in_executor(None, recognizer.sync_watchlist):
+                    print(f"Watchlist reloaded ({len(recognizer.index)} encodings)")
+            except Exception as e:
+                print(f"Watchlist reload failed: {e!r}")
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_path=None):
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        poller = asyncio.create_task(self.poll_watchlist()) if self.watchlist_poll else None
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if poller is not None:
+                poller.cancel()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class RecognitionClient:
+    """Thin client with the same analyze(frame) interface as FrameAnalyzer
+
+    url is http://host:port or unix:///path/to/socket.
+    """
+
+    def __init__(self, url, timeout=30, jpeg_quality=90):
+        self.url = urlparse(url)
+        self.timeout = timeout
+        self.jpeg_quality = jpeg_quality
+        self.connection = None
+
+    def _connect(self):
+        if self.url.scheme == "unix":
+            return _UnixHTTPConnection(self.url.path, self.timeout)
+        return http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=self.timeout)
+
+    def _request(self, method, path, body=None, headers=None):
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self._connect()
+            sent = False
+            try:
+                self.connection.request(method, path, body=body, headers=headers or {})
+                sent = True
+                response = self.connection.getresponse()
+                payload = json.loads(response.read())
+                break
+            except (OSError, http.client.HTTPException):
+                self.connection.close()
+                self.connection = None
+                # Reconnect once if the kept-alive socket went away, but never resend
+                # an /analyze POST the service may already be working on
+                if attempt or (sent and method != "GET"):
+                    raise
+        if response.status != 200:
+            raise RuntimeError(f"Recognition service error {response.status}: {payload.get('error')}")
+        return payload
+
+    def encode(self, frame):
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("could not encode frame")
+        return jpeg.tobytes()
+
+    def analyze(self, frame):
+        """Identify and classify every face in one frame"""
+        payload = self._request("POST", "/analyze", self.encode(frame), {"Content-Type": "image/jpeg"})
+        return [face_from_json(face) for face in payload["results"][0]]
+
+    def analyze_batch(self, frames):
+        """Analyse several frames in one request"""
+        body = json.dumps({"frames": [base64.b64encode(self.encode(frame)).decode() for frame in frames]})
+        payload = self._request("POST", "/analyze", body, {"Content-Type": "application/json"})
+        return [[face_from_json(face) for face in faces] for faces in payload["results"]]
+
+    def health(self):
+        return self._request("GET", "/health")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve face recognition and emotion detection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="frames analysed at once")
+    parser.add_argument("--max-pending", type=int, default=32, help="requests queued before returning 503")
+    parser.add_argument("--watchlist-poll", type=float, default=5.0,
+                        help="seconds between checks for criminals added or removed elsewhere (0 disables)")
+    args = parser.parse_args()
+
+    import database
+    from encoding_snapshot import DEFAULT_SNAPSHOT_PATH
+    from face_recognition_module import FaceRecognizer
+    from emotion_detection import EmotionDetector
+    from frame_analysis import FrameAnalyzer
+
+    recognizer = FaceRecognizer(database, snapshot_path=DEFAULT_SNAPSHOT_PATH)
+    emotion_detector = EmotionDetector()
+    # Concurrent requests share emotion inference batches
+    analyzer = FrameAnalyzer(recognizer, emotion_detector, scheduler=emotion_detector.create_scheduler())
+    service = RecognitionService(analyzer, args.max_concurrency, args.max_pending, args.watchlist_poll)
+    instrumentation.start_export()
+    print(f"Recognition service listening on {args.unix or f'{args.host}:{args.port}'}")
+    asyncio.run(service.serve(args.host, args.port, args.unix))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+# stream_manager.py
+"""Face recognition over many cameras with one shared pool of workers
+
+    python stream_manager.py 0 1 rtsp://10.0.0.5/stream footage.mp4 --workers 4 --max-fps 10
+
+Every source gets its own capture thread and drop-oldest queue. Workers
+pick the next camera by start-time fair queueing: a camera is charged
+1/weight per processed frame and the least charged camera with a frame
+waiting goes next, so no feed starves. Cameras with a watchlist hit in
+the last hit_hold seconds get boost_weight times the share (and frame
+budget) of the others. A camera's frames are never processed by two
+workers at once, so per-camera state such as FaceTracker stays consistent.
+"""
+import argparse
+import os
+import threading
+import time
+import cv2
+from video_pipeline import DropOldestQueue, StageStats
+
+
+def parse_source(source):
+    """Device index for digit strings, otherwise a file path or stream URL"""
+    return int(source) if str(source).isdigit() else source
+
+
+class CameraStream:
+    """One source: its capture thread, newest-frame queue and scheduling state"""
+
+    def __init__(self, camera_id, source, processor, max_fps=None, queue_size=2, loop=False,
+                 reconnect_delay=2.0):
+        self.camera_id = camera_id
+        self.source = parse_source(source)
+        self.processor = processor  # frame -> [FaceAnalysis], called by one worker at a time
+        self.max_fps = max_fps  # frame budget; None processes every frame the workers can take
+        self.loop = loop
+        self.reconnect_delay = reconnect_delay
+        # Recorded files are played back at their own frame rate, like a live feed
+        self.is_file = isinstance(self.source, str) and os.path.isfile(self.source)
+        self.frame_queue = DropOldestQueue(queue_size)
+        self.stats = StageStats()
+        self.lock = threading.Lock()
+        self.latest_frame_item = None  # (seq, frame)
+        self.latest_result_item = None  # (seq, faces)
+        # Scheduling state, guarded by the manager's condition
+        self.virtual_time = 0.0
+        self.next_allowed = 0.0
+        self.busy = False
+        self.boosted_until = 0.0
+        self.processed = 0
+        self.finished = False
+        self.running = False
+        self.thread = None
+
+    def start(self, on_frame):
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, args=(on_frame,),
+                                       name=f"capture-{self.camera_id}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def latest(self):
+        """(newest frame, newest faces), either may be None"""
+        with self.lock:
+            frame = self.latest_frame_item[1] if self.latest_frame_item else None
+            faces = self.latest_result_item[1] if self.latest_result_item else None
+        return frame, faces
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.source)
+        if not capture.isOpened():
+            capture.release()
+            print(f"Camera {self.camera_id}: could not open {self.source}")
+            return None
+        return capture
+
+    def _capture_loop(self, on_frame):
+        capture = self._open()
+        frame_interval = 1.0 / ((capture.get(cv2.CAP_PROP_FPS) if capture else 0) or 25.0)
+        next_frame_time = time.monotonic()
+        seq = 0
+        while self.running:
+            if capture is None:
+                if self.is_file:
+                    break
+                time.sleep(self.reconnect_delay)
+                capture = self._open()
+                continue
+            if self.is_file:
+                delay = next_frame_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_frame_time = max(next_frame_time + frame_interval, time.monotonic() - frame_interval)
+            start = time.perf_counter()
+            ret, frame = capture.read()
+            if not ret:
+                if self.is_file and self.loop:
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                capture.release()
+                capture = None
+                if not self.is_file:
+                    print(f"Camera {self.camera_id}: lost {self.source}, reconnecting")
+                continue
+            seq += 1
+            self.stats.record("capture", time.perf_counter() - start)
+            self.stats.tick("capture")
+            with self.lock:
+                self.latest_frame_item = (seq, frame)
+            self.frame_queue.put((seq, frame))
+            on_frame()
+        if capture is not None:
+            capture.release()
+        self.finished = True
+
+
+class StreamManager:
+    """Capture threads per camera feeding a shared, fairly scheduled worker pool"""
+
+    def __init__(self, workers=None, boost_weight=4.0, hit_hold=10.0, on_result=None):
+        self.workers = workers or os.cpu_count() or 4
+        self.boost_weight = boost_weight
+        self.hit_hold = hit_hold
+        self.on_result = on_result  # called as on_result(camera_id, faces) from the workers
+        self.cameras = {}
+        self.condition = threading.Condition()
+        self.virtual_clock = 0.0  # start tag of the frame most recently scheduled
+        self.running = False
+        self.threads = []
+
+    def add_camera(self, camera_id, source, processor, max_fps=None, loop=False):
+        camera = CameraStream(camera_id, source, processor, max_fps=max_fps, loop=loop)
+        with self.condition:
+            if camera_id in self.cameras:
+                raise ValueError(f"Camera '{camera_id}' already exists")
+            camera.virtual_time = self.virtual_clock
+            self.cameras[camera_id] = camera
+        if self.running:
+            camera.start(self._frame_arrived)
+        return camera
+
+    def remove_camera(self, camera_id):
+        with self.condition:
+            camera = self.cameras.pop(camera_id)
+        camera.stop()
+
+    def start(self):
+        self.running = True
+        for camera in list(self.cameras.values()):
+            camera.start(self._frame_arrived)
+        self.threads = [threading.Thread(target=self._worker_loop, name=f"stream-worker-{i}", daemon=True)
+                        for i in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        for camera in list(self.cameras.values()):
+            camera.stop()
+        for thread in self.threads:
+            thread.join(timeout=2)
+
+    def finished(self):
+        """True once every camera's capture thread has ended (e.g. all files played)"""
+        return all(camera.finished for camera in self.cameras.values())
+
+    def latest(self, camera_id):
+        return self.cameras[camera_id].latest()
+
+    def metrics(self):
+        """Per-camera processed fps, capture fps, latency, drops and boost state"""
+        now = time.monotonic()
+        metrics = {}
+        with self.condition:
+            cameras = list(self.cameras.values())
+        for camera in cameras:
+            snapshot = camera.stats.snapshot()
+            metrics[camera.camera_id] = {
+                "fps": snapshot["fps"].get("inference", 0.0),
+                "capture_fps": snapshot["fps"].get("capture", 0.0),
+                "latency_ms": snapshot["latency_ms"].get("inference", 0.0),
+                "processed": camera.processed,
+                "dropped_frames": camera.frame_queue.dropped,
+                "boosted": camera.boosted_until > now,
+            }
+        return metrics
+
+    def _frame_arrived(self):
+        with self.condition:
+            self.condition.notify()
+
+    def _next_camera(self):
+        """Block until some camera has a frame it may process now, then claim it"""
+        with self.condition:
+            while self.running:
+                now = time.monotonic()
+                ready, wake = [], None
+                for camera in self.cameras.values():
+                    if camera.busy or not len(camera.frame_queue):
+                        continue
+                    if camera.next_allowed > now:  # over its frame budget
+                        wake = camera.next_allowed if wake is None else min(wake, camera.next_allowed)
+                        continue
+                    ready.append(camera)
+                if ready:
+                    camera = min(ready, key=lambda camera: camera.virtual_time)
+                    weight = self.boost_weight if camera.boosted_until > now else 1.0
+                    # A camera that sat idle resumes at the current clock instead of bursting
+                    start_tag = max(camera.virtual_time, self.virtual_clock)
+                    self.virtual_clock = start_tag
+                    camera.virtual_time = start_tag + 1.0 / weight
+                    if camera.max_fps:
+                        camera.next_allowed = now + 1.0 / (camera.max_fps * weight)
+                    camera.busy = True
+                    return camera
+                self.condition.wait(0.1 if wake is None else max(0.001, wake - now))
+            return None
+
+    def _worker_loop(self):
+        while True:
+            camera = self._next_camera()
+            if camera is None:
+                return
+            try:
+                item = camera.frame_queue.get(timeout=0)
+                if item is not None:
+                    self._process(camera, *item)
+            finally:
+                with self.condition:
+                    camera.busy = False
+                    self.condition.notify()
+
+    def _process(self, camera, seq, frame):
+        start = time.perf_counter()
+        try:
+            faces = camera.processor(frame)
+        except Exception as e:
+            print(f"Camera {camera.camera_id}: frame processing failed: {e}")
+            return
+        camera.stats.record("inference", time.perf_counter() - start)
+        camera.stats.tick("inference")
+        camera.processed += 1
+        with camera.lock:
+            camera.latest_result_item = (seq, faces)
+        if any(face.identity != "Unknown" for face in faces):
+            with self.condition:
+                camera.boosted_until = time.monotonic() + self.hit_hold
+        if self.on_result is not None:
+            self.on_result(camera.camera_id, faces)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run recognition over several cameras at once")
+    parser.add_argument("sources", nargs="+", help="device indices, video files or stream URLs")
+    parser.add_argument("--workers", type=int, default=None, help="shared worker threads (default: all CPUs)")
+    parser.add_argument("--max-fps", type=float, default=None, help="frames per second budget per camera")
+    parser.add_argument("--boost", type=float, default=4.0, help="share multiplier for cameras with a watchlist hit")
+    parser.add_argument("--hit-hold", type=float, default=10.0, help="seconds a hit keeps a camera boosted")
+    parser.add_argument("--loop", action="store_true", help="replay video files when they end")
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    import database
+    import instrumentation
+    from encoding_snapshot import DEFAULT_SNAPSHOT_PATH
+    from face_recognition_module import FaceRecognizer
+    from emotion_detection import EmotionDetector
+    from frame_analysis import FrameAnalyzer
+    from face_tracking import FaceTracker
+    from adaptive_detection import AdaptiveDetector
+
+    recognizer = FaceRecognizer(database, snapshot_path=DEFAULT_SNAPSHOT_PATH)
+    emotion_detector = EmotionDetector()
+    recognizer.warm_up()
+    emotion_detector.warm_up()
+    # One scheduler so face crops from all cameras share emotion inference batches
+    scheduler = emotion_detector.create_scheduler()
+
+    def log_hits(camera_id, faces):
+        for face in faces:
+            if face.identity != "Unknown":
+                database.log_emotion(face.identity, face.emotion)
+
+    manager = StreamManager(args.workers, args.boost, args.hit_hold, on_result=log_hits)
+    for index, source in enumerate(args.sources):
+        analyzer = FrameAnalyzer(recognizer, emotion_detector, scheduler=scheduler,
+                                 detector=AdaptiveDetector.from_env(emotion_detector))
+        manager.add_camera(f"cam{index}", source, FaceTracker(analyzer).process, args.max_fps, args.loop)
+    instrumentation.start_export()
+    manager.start()
+    try:
+        while not manager.finished():
+            time.sleep(args.report_interval)
+            if recognizer.sync_watchlist():  # criminals changed by the GUI or bulk_enroll.py
+                print(f"Watchlist reloaded ({len(recognizer.index)} encodings)")
+            for camera_id, stats in manager.metrics().items():
+                print(f"{camera_id}: {stats['fps']:5.1f} fps of {stats['capture_fps']:5.1f} captured, "
+                      f"{stats['latency_ms']:6.1f} ms, {stats['dropped_frames']} dropped"
+                      f"{'  [watchlist hit]' if stats['boosted'] else ''}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+        scheduler.close()
+        database.flush_emotion_logs()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# database migrates NCA_DB_PATH on import; keep the tests away from the shipped users.db
+os.environ["NCA_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="nca-tests-"), "import.db")
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """The database module pointed at a fresh, fully migrated file"""
+    import database
+    database.close_emotion_log_writer()
+    database.close_db_connection()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    yield database
+    database.close_emotion_log_writer()
+    database.close_db_connection()
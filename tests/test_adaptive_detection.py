@@ -0,0 +1,81 @@
+# tests/test_adaptive_detection.py
+import numpy as np
+from adaptive_detection import MotionROI, ScaleTuner, merge_regions
+
+
+def frame_with_square(x, y, size=60):
+    gray = np.zeros((480, 640), dtype=np.uint8)
+    gray[y:y + size, x:x + size] = 255
+    return gray
+
+
+def contains(region, box):
+    return (region[0] <= box[0] and region[1] <= box[1] and
+            region[0] + region[2] >= box[0] + box[2] and region[1] + region[3] >= box[1] + box[3])
+
+
+def test_merge_regions_joins_overlapping_boxes_only():
+    merged = merge_regions([(0, 0, 10, 10), (5, 5, 10, 10), (100, 100, 5, 5)])
+
+    assert sorted(merged) == [(0, 0, 15, 15), (100, 100, 5, 5)]
+
+
+def test_first_frame_searches_everything():
+    motion = MotionROI()
+
+    assert motion.regions(frame_with_square(100, 100)) is None
+    assert motion.searched_fraction == 1.0
+
+
+def test_static_frames_search_only_kept_faces():
+    motion = MotionROI()
+    motion.regions(frame_with_square(100, 100))
+
+    assert motion.regions(frame_with_square(100, 100)) == []
+    assert motion.searched_fraction == 0.0
+    regions = motion.regions(frame_with_square(100, 100), keep=[(300, 200, 40, 40)])
+    assert len(regions) == 1 and contains(regions[0], (300, 200, 40, 40))
+
+
+def test_moving_square_is_searched():
+    motion = MotionROI()
+    motion.regions(frame_with_square(100, 100))
+
+    regions = motion.regions(frame_with_square(130, 110))
+
+    assert len(regions) == 1
+    assert contains(regions[0], (100, 100, 90, 70))
+    assert 0 < motion.searched_fraction < 0.2
+
+
+def test_full_frame_every_interval():
+    motion = MotionROI(full_frame_interval=5)
+    results = [motion.regions(frame_with_square(100, 100)) for _ in range(10)]
+
+    assert [result is None for result in results] == [True, False, False, False, True,
+                                                      False, False, False, False, True]
+
+
+def test_widespread_motion_falls_back_to_full_frame():
+    motion = MotionROI(max_fraction=0.6)
+    motion.regions(np.zeros((480, 640), dtype=np.uint8))
+
+    assert motion.regions(np.full((480, 640), 200, dtype=np.uint8)) is None
+    assert motion.searched_fraction == 1.0
+
+
+def test_tuner_steps_down_while_slow_and_back_up_with_headroom():
+    tuner = ScaleTuner(target_fps=10, scales=(1.0, 0.5, 0.25), initial=1.0, window=3)
+
+    # 5 fps: one step down per full window, none before
+    assert [tuner.update(0.2) for _ in range(3)] == [1.0, 1.0, 0.5]
+    assert [tuner.update(0.2) for _ in range(6)][-1] == 0.25  # clamped at the smallest scale
+    # 12 fps is above target but inside the headroom, so the scale holds
+    assert [tuner.update(1 / 12) for _ in range(3)][-1] == 0.25
+    # 20 fps has headroom: step back up
+    assert [tuner.update(0.05) for _ in range(3)][-1] == 0.5
+    assert [tuner.update(0.05) for _ in range(6)][-1] == 1.0
+
+
+def test_tuner_starts_at_nearest_scale():
+    assert ScaleTuner(target_fps=10, initial=0.6).scale == 0.5
@@ -0,0 +1,53 @@
+import os
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+import batch_analysis
+
+
+def write_video(path, frames=50, fps=25):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for i in range(frames):
+        writer.write(np.full((48, 64, 3), i % 256, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+class StubAnalyzer:
+    def analyze(self, frame):
+        return [SimpleNamespace(identity="C1", emotion="Happy")]
+
+
+def test_recording_ends_at_modification_time(tmp_path):
+    path = write_video(tmp_path / "cam.avi", frames=50, fps=25)
+    os.utime(path, (1_700_000_010, 1_700_000_010))
+
+    segments = batch_analysis.plan_segments(path, segment_seconds=1)
+
+    assert [(first, end) for _, first, end, _, _ in segments] == [(0, 25), (25, 50)]
+    assert {start_ms for *_, start_ms in segments} == {1_700_000_008_000}
+    assert batch_analysis.plan_segments(path, 1, start_ms=5)[0][4] == 5
+
+
+def test_segment_without_frame_count_reads_to_the_end(tmp_path, monkeypatch):
+    path = write_video(tmp_path / "cam.avi", frames=50, fps=25)
+    os.utime(path, (1_700_000_010, 1_700_000_010))
+    monkeypatch.setattr(batch_analysis, "_analyzer", StubAnalyzer())
+
+    _, frames, analyzed, unknown, rows = batch_analysis.analyze_segment(((path, 0, None, 25.0, None), 5))
+
+    assert (frames, analyzed, unknown) == (50, 10, 0)
+    assert rows[0] == ("C1", 1_700_000_008_000, "Happy")
+    assert rows[-1][1] == 1_700_000_008_000 + 45 * 40
+
+
+def test_summary_names_keep_same_named_files_apart(tmp_path):
+    paths = [str(tmp_path / "cam1" / "day.mp4"), str(tmp_path / "cam2" / "day.mp4")]
+
+    names = batch_analysis.summary_names(paths)
+
+    assert names[paths[0]] == os.path.join("cam1", "day.mp4.summary.json")
+    assert names[paths[1]] == os.path.join("cam2", "day.mp4.summary.json")
+    assert batch_analysis.summary_names([paths[0]]) == {paths[0]: "day.mp4.summary.json"}
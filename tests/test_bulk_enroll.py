@@ -0,0 +1,39 @@
+# tests/test_bulk_enroll.py
+import numpy as np
+import pytest
+from bulk_enroll import enroll, read_records
+
+
+def test_directory_records_carry_no_details(tmp_path):
+    (tmp_path / "1.jpg").write_bytes(b"")
+    (tmp_path / "notes.txt").write_bytes(b"")
+
+    assert list(read_records(str(tmp_path))) == [("1", None, None, None, str(tmp_path / "1.jpg"))]
+
+
+def test_mugshot_keeps_existing_details(db):
+    db.add_criminal("Terrelonge", 27, "Mental Manslaughter", "1")
+    encoding = np.full(128, 0.5, dtype=np.float32)
+
+    db.add_criminals_bulk([(None, None, None, "1", encoding), (None, None, None, "2", encoding)])
+
+    assert db.get_criminal_by_id("1")[1:5] == ("Terrelonge", 27, "Mental Manslaughter", "1")
+    assert db.get_criminal_by_id("2")[1:5] == ("2", None, None, "2")
+    assert set(db.load_criminal_encodings()[0]) == {"1", "2"}
+
+
+def test_csv_details_replace_existing(db):
+    db.add_criminal("Old Name", 27, "Theft", "1")
+
+    db.add_criminals_bulk([("New Name", 28, None, "1", None)])
+
+    assert db.get_criminal_by_id("1")[1:5] == ("New Name", 28, "Theft", "1")
+
+
+def test_spawned_workers_report_unreadable_images(db, tmp_path):
+    pytest.importorskip("face_recognition")
+    (tmp_path / "1.jpg").write_bytes(b"not an image")
+    failures = tmp_path / "failures.csv"
+
+    assert enroll(str(tmp_path), workers=1, failures_path=str(failures)) == (0, 1)
+    assert failures.read_text().strip().endswith("unreadable image")
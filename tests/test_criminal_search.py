@@ -0,0 +1,133 @@
+# tests/test_criminal_search.py
+import pytest
+
+
+@pytest.fixture(params=["fts", "like"])
+def criminals(db, request, monkeypatch):
+    """A small watchlist, searched through FTS5 or the LIKE fallback"""
+    if request.param == "fts" and not db._has_fts():
+        pytest.skip("SQLite built without FTS5")
+    if request.param == "like":
+        monkeypatch.setattr(db, "_has_fts", lambda: False)
+    db.add_criminals_bulk([
+        ("John Smith", 34, "Armed robbery", "C001", None),
+        ("Johanna Reyes", 29, "Fraud", "C002", None),
+        ("Peter Johnson", 51, "Arson", "C003", None),
+        ("Ann Smithers", 44, "Robbery", "C004", None),
+        ("Li Wei_50%", 38, "Fraud", "C005", None),
+    ])
+    return db
+
+
+def ids(rows):
+    return [row[4] for row in rows]
+
+
+def test_every_word_must_prefix_match(criminals):
+    assert ids(criminals.search_criminals("joh")) == ["C001", "C002", "C003"]
+    assert ids(criminals.search_criminals("smith rob")) == ["C001", "C004"]
+    assert ids(criminals.search_criminals("fraud")) == ["C002", "C005"]
+    assert ids(criminals.search_criminals("c00")) == ["C001", "C002", "C003", "C004", "C005"]
+    assert criminals.search_criminals("mith") == []
+
+
+def test_search_follows_renames(criminals):
+    criminals.add_criminals_bulk([("Peter Quill", None, None, "C003", None)])
+
+    assert ids(criminals.search_criminals("johnson")) == []
+    assert ids(criminals.search_criminals("quill")) == ["C003"]
+
+
+def test_like_wildcards_are_literal(db, monkeypatch):
+    monkeypatch.setattr(db, "_has_fts", lambda: False)
+    db.add_criminals_bulk([("Wei_50%", 38, "Fraud", "C1", None), ("Weird", 40, "Fraud", "C2", None)])
+
+    assert ids(db.search_criminals("wei_")) == ["C1"]
+    assert ids(db.search_criminals("wei_50%")) == ["C1"]
+
+
+def test_keyset_pages_forwards_and_back(criminals):
+    first = criminals.search_criminals(limit=2)
+    second = criminals.search_criminals(after=first[-1][4], limit=2)
+    third = criminals.search_criminals(after=second[-1][4], limit=2)
+
+    assert [ids(first), ids(second), ids(third)] == [["C001", "C002"], ["C003", "C004"], ["C005"]]
+    assert ids(criminals.search_criminals(before="C005", limit=2)) == ["C003", "C004"]
+    assert ids(criminals.search_criminals(before="C002", limit=2)) == ["C001"]
+    assert ids(criminals.search_criminals("smith", after="C001")) == ["C004"]
+    assert ids(criminals.search_criminals("smith", before="C004")) == ["C001"]
+
+
+class FakeTree:
+    """The parts of ttk.Treeview PagedCriminalList uses, with a 10-row viewport"""
+
+    def __init__(self):
+        self.rows = []  # (item, values)
+        self.top = 0
+        self.next_item = 0
+
+    def configure(self, **options):
+        pass
+
+    def insert(self, parent, index, values):
+        self.next_item += 1
+        item = f"I{self.next_item}"
+        self.rows.insert(len(self.rows) if index == "end" else index, (item, values))
+        return item
+
+    def delete(self, *items):
+        self.rows = [row for row in self.rows if row[0] not in items]
+
+    def get_children(self):
+        return tuple(item for item, _ in self.rows)
+
+    def exists(self, item):
+        return item in self.get_children()
+
+    def index(self, item):
+        return self.get_children().index(item)
+
+    def yview(self):
+        return (self.top / len(self.rows), min(1.0, (self.top + 10) / len(self.rows)))
+
+    def yview_moveto(self, fraction):
+        self.top = round(fraction * len(self.rows))
+
+    def after_idle(self, callback):
+        callback()
+
+    def scroll_to(self, row):
+        self.top = row
+        self.owner.on_scroll(*self.yview())
+
+    def visible_ids(self):
+        return [values[0] for _, values in self.rows[self.top:self.top + 10]]
+
+
+class FakeScrollbar:
+    def configure(self, **options):
+        pass
+
+    def set(self, first, last):
+        pass
+
+
+def test_criminal_list_keeps_a_fixed_window_of_rows(db):
+    from gui import PagedCriminalList
+    db.add_criminals_bulk([(f"Person {i}", 30, "Fraud", f"C{i:04d}", None) for i in range(1000)])
+    tree = FakeTree()
+    tree.owner = criminal_list = PagedCriminalList(tree, FakeScrollbar(), page_size=50, max_pages=3)
+    criminal_list.reset()
+    assert len(tree.rows) == 50
+
+    for _ in range(30):  # scroll to the very bottom, one screen at a time
+        tree.scroll_to(len(tree.rows) - 10)
+        assert len(tree.rows) <= 150
+    assert criminal_list.at_end and tree.visible_ids()[-1] == "C0999"
+
+    tree.scroll_to(20)  # and back up a little: the rows stay in order around the view
+    assert tree.visible_ids() == [f"C{i:04d}" for i in range(900 - 30, 900 - 20)]
+    for _ in range(30):
+        tree.scroll_to(0)
+        assert len(tree.rows) <= 150
+    assert criminal_list.at_start and tree.visible_ids()[0] == "C0000"
@@ -0,0 +1,75 @@
+# tests/test_emotion_aggregates.py
+import random
+from collections import Counter
+DAY_MS = 86_400_000
+START_MS = 19_000 * DAY_MS
+
+
+def random_rows(seed, count):
+    """Rows over three days for a few criminals, so every rollup has several buckets"""
+    rng = random.Random(seed)
+    return [(rng.choice(["C1", "C2", "C3"]), START_MS + rng.randrange(3 * DAY_MS),
+             rng.choice(["Happy", "Sad", "Angry", "Neutral"])) for _ in range(count)]
+
+
+def raw_aggregates(db):
+    """Totals and rollups recomputed in Python from every row in emotion_logs"""
+    cursor = db.get_db_connection().cursor()
+    cursor.execute("SELECT criminal_id, timestamp, emotion FROM emotion_logs")
+    logs = cursor.fetchall()
+    totals = Counter((criminal_id, emotion) for criminal_id, _, emotion in logs)
+    rollups = Counter((criminal_id, bucket_ms, timestamp - timestamp % bucket_ms, emotion)
+                      for criminal_id, timestamp, emotion in logs
+                      for bucket_ms in db.ROLLUP_BUCKETS.values())
+    return dict(totals), dict(rollups)
+
+
+def stored_aggregates(db):
+    """The emotion_totals and emotion_rollups tables as dicts"""
+    cursor = db.get_db_connection().cursor()
+    cursor.execute("SELECT criminal_id, emotion, count FROM emotion_totals")
+    totals = {(criminal_id, emotion): count for criminal_id, emotion, count in cursor.fetchall()}
+    cursor.execute("SELECT criminal_id, bucket_ms, bucket_start, emotion, count FROM emotion_rollups")
+    rollups = {row[:4]: row[4] for row in cursor.fetchall()}
+    return totals, rollups
+
+
+def test_bulk_inserts_keep_aggregates_in_step(db):
+    # Overlapping batches exercise the ON CONFLICT increments
+    for seed in range(5):
+        db.log_emotions_bulk(random_rows(seed, 400))
+
+    assert stored_aggregates(db) == raw_aggregates(db)
+    assert sum(stored_aggregates(db)[0].values()) == 2000
+
+
+def test_background_writes_keep_aggregates_in_step(db):
+    for emotion in ["Happy", "Sad", "Happy", "Angry", "Happy"]:
+        db.log_emotion("C1", emotion)
+    db.log_emotions_bulk(random_rows(0, 100))
+
+    assert db.get_emotion_counts("C1")["Happy"] >= 3
+    assert stored_aggregates(db) == raw_aggregates(db)
+
+
+def test_rebuild_reproduces_incremental_aggregates(db):
+    for seed in range(3):
+        db.log_emotions_bulk(random_rows(seed, 300))
+    incremental = stored_aggregates(db)
+
+    db.rebuild_emotion_aggregates()
+
+    assert stored_aggregates(db) == incremental == raw_aggregates(db)
+
+
+def test_rebuild_repairs_drifted_aggregates(db):
+    db.log_emotions_bulk(random_rows(0, 300))
+    conn = db.get_db_connection()
+    conn.execute("UPDATE emotion_totals SET count = count + 7")
+    conn.execute("DELETE FROM emotion_rollups WHERE bucket_ms = ?", (db.ROLLUP_BUCKETS["hour"],))
+    conn.execute("INSERT INTO emotion_totals VALUES ('ghost', 'Sad', 3)")
+    conn.commit()
+
+    db.rebuild_emotion_aggregates()
+
+    assert stored_aggregates(db) == raw_aggregates(db)
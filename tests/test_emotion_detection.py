@@ -0,0 +1,49 @@
+# tests/test_emotion_detection.py
+import threading
+import types
+import cv2
+import pytest
+import emotion_detection
+
+
+class CountingCascade:
+    created = []
+
+    def __init__(self, path):
+        CountingCascade.created.append(self)
+
+
+def test_each_thread_gets_its_own_cascade(monkeypatch):
+    monkeypatch.setattr(emotion_detection, "load_emotion_model", lambda backend, model_path: None)
+    monkeypatch.setattr(cv2, "CascadeClassifier", CountingCascade, raising=False)
+    monkeypatch.setattr(cv2, "data", types.SimpleNamespace(haarcascades=""), raising=False)
+    CountingCascade.created = []
+    detector = emotion_detection.EmotionDetector()
+
+    assert detector.face_cascade is detector.face_cascade
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(detector.face_cascade)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(CountingCascade.created) == 5
+    assert len({id(cascade) for cascade in seen + [detector.face_cascade]}) == 5
+
+
+def test_keras_model_falls_back_to_the_shipped_h5(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "emotion_model.h5").write_bytes(b"")
+    assert emotion_detection.default_keras_model_path() == "emotion_model.h5"
+
+    (tmp_path / "emotion_model.keras").write_bytes(b"")
+    assert emotion_detection.default_keras_model_path() == "emotion_model.keras"
+
+
+@pytest.mark.parametrize("backend", ["keras", "tflite"])
+def test_missing_model_file_fails_loudly(tmp_path, monkeypatch, backend):
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(FileNotFoundError, match="not found"):
+        emotion_detection.load_emotion_model(backend)
@@ -0,0 +1,79 @@
+# tests/test_emotion_log_writer.py
+import time
+import pytest
+
+
+@pytest.fixture
+def writer(db, monkeypatch):
+    """A writer that only commits on a full batch, flush or close, recording each batch size"""
+    batches = []
+    write_batch = db.EmotionLogWriter._write_batch
+
+    def recording_write_batch(self, conn, rows):
+        batches.append(len(rows))
+        write_batch(self, conn, rows)
+
+    monkeypatch.setattr(db.EmotionLogWriter, "_write_batch", recording_write_batch)
+    writer = db.EmotionLogWriter(batch_size=3, flush_interval=60)
+    writer.batches = batches
+    yield writer
+    writer.close()
+
+
+def test_rows_are_written_in_batches(db, writer):
+    for i in range(7):
+        writer.write("C1", 1000 + i, "Happy")
+
+    assert writer.flush(timeout=5)
+
+    assert writer.batches == [3, 3, 1]
+    assert [timestamp for timestamp, _ in db.get_emotion_logs("C1")] == list(range(1000, 1007))
+
+
+def test_reads_flush_queued_logs(db):
+    for emotion in ("Happy", "Sad", "Happy"):
+        db.log_emotion("C1", emotion)
+
+    assert [emotion for _, emotion in db.get_emotion_logs("C1")] == ["Happy", "Sad", "Happy"]
+    assert db.get_emotion_counts("C1") == {"Happy": 2, "Sad": 1}
+
+
+def test_close_writes_queued_rows_and_stops(db, writer):
+    writer.write("C1", 1000, "Fear")
+
+    writer.close()
+
+    assert not writer.thread.is_alive()
+    assert db.get_emotion_logs("C1") == [(1000, "Fear")]
+    assert writer.flush(timeout=5) is False  # returns at once instead of waiting on a dead thread
+
+
+def test_failed_batch_does_not_stop_the_writer(db, writer, monkeypatch):
+    write_batch = db.EmotionLogWriter._write_batch
+    calls = []
+
+    def failing_once(self, conn, rows):
+        calls.append(rows)
+        if len(calls) == 1:
+            raise TypeError("bad row")
+        write_batch(self, conn, rows)
+
+    monkeypatch.setattr(db.EmotionLogWriter, "_write_batch", failing_once)
+    writer.write("C1", 1000, "Sad")
+    assert writer.flush(timeout=5)
+    writer.write("C1", 2000, "Happy")
+    assert writer.flush(timeout=5)
+
+    assert writer.thread.is_alive()
+    assert db.get_emotion_logs("C1") == [(2000, "Happy")]
+
+
+def test_flush_emotion_logs_gives_up_on_a_stalled_writer(db, monkeypatch):
+    db.log_emotion("C1", "Happy")
+    monkeypatch.setattr(db.EmotionLogWriter, "_write_batch", lambda self, conn, rows: time.sleep(2))
+    db.log_emotion("C1", "Sad")
+
+    start = time.monotonic()
+    db.flush_emotion_logs(timeout=0.2)
+
+    assert time.monotonic() - start < 1
@@ -0,0 +1,54 @@
+# tests/test_emotion_series.py
+from collections import Counter
+DAY_MS = 86_400_000
+START_MS = 19_000 * DAY_MS  # a UTC midnight, so rollup buckets line up with the window
+
+
+def log_every(db, step_ms, span_ms):
+    """Rows every step_ms; each 3-minute stretch has one clearly dominant emotion"""
+    rows = []
+    for i, timestamp in enumerate(range(START_MS, START_MS + span_ms, step_ms)):
+        dominant = ["Happy", "Sad", "Angry"][(timestamp - START_MS) // 180_000 % 3]
+        rows.append(("C1", timestamp, dominant if i % 3 else "Neutral"))
+    db.log_emotions_bulk(rows)
+    return rows
+
+
+def expected_series(rows, width):
+    """Dominant emotion and its count per width-ms bucket, straight from the raw rows"""
+    buckets = {}
+    for _, timestamp, emotion in rows:
+        buckets.setdefault((timestamp - START_MS) // width, Counter())[emotion] += 1
+    return [(START_MS + bucket * width, *counts.most_common(1)[0]) for bucket, counts in sorted(buckets.items())]
+
+
+def test_one_hour_window_keeps_max_points(db):
+    rows = log_every(db, 1000, 3_600_000)
+
+    series = db.get_emotion_series("C1", START_MS, START_MS + 3_600_000 - 1, max_points=600)
+
+    assert len(series) == 600
+    assert series == expected_series(rows, 6000)
+
+
+def test_one_day_window_reads_minute_rollups(db):
+    rows = log_every(db, 10_000, DAY_MS)
+    # Rollups alone must answer the query
+    db.get_db_connection().execute("DELETE FROM emotion_logs")
+    db.get_db_connection().commit()
+
+    series = db.get_emotion_series("C1", START_MS, START_MS + DAY_MS - 1, max_points=600)
+
+    # 144 s per point rounds up to three whole minute rollups
+    assert len(series) == 480
+    assert series == expected_series(rows, 180_000)
+    assert sum(count for _, _, count in series) == sum(1 for row in rows if row[2] != "Neutral")
+
+
+def test_short_window_reads_raw_rows(db):
+    rows = log_every(db, 1000, 600_000)
+
+    series = db.get_emotion_series("C1", START_MS, START_MS + 600_000 - 1, max_points=600)
+
+    assert series == expected_series(rows, 1000)
+    assert Counter(emotion for _, emotion, _ in series) == Counter(emotion for _, _, emotion in rows)
@@ -0,0 +1,83 @@
+# tests/test_encoding_snapshot.py
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from encoding_snapshot import EncodingSnapshot, load_centroids, refresh_snapshot
+from face_recognition_module import FaceRecognizer
+
+
+@pytest.mark.parametrize("index", ["exact", "ivf"])
+def test_empty_watchlist(db, tmp_path, index):
+    # Criminals added through the form have no encoding yet
+    db.add_criminal("Terrelonge", 27, "Manslaughter", "1")
+    path = str(tmp_path / "watchlist.snapshot")
+
+    recognizer = FaceRecognizer(db, index=index, snapshot_path=path)
+
+    snapshot = EncodingSnapshot(path)
+    assert snapshot.ids == [] and snapshot.encodings.shape == (0, 128)
+    assert recognizer.identify(np.zeros((2, 128), dtype=np.float32)) == [("Unknown", None)] * 2
+
+
+def test_snapshot_picks_up_new_encoding(db, tmp_path):
+    path = str(tmp_path / "watchlist.snapshot")
+    refresh_snapshot(db, path)
+    encoding = np.full(128, 0.1, dtype=np.float32)
+    db.add_criminal("Doe", 30, "Fraud", "7", encoding)
+
+    snapshot = refresh_snapshot(db, path)
+
+    assert snapshot.ids == ["7"]
+    np.testing.assert_array_equal(snapshot.encodings[0], encoding)
+
+
+def test_refresh_never_modifies_a_mapped_snapshot(db, tmp_path):
+    path = str(tmp_path / "watchlist.snapshot")
+    db.add_criminal("Doe", 30, "Fraud", "7", np.full(128, 0.1, dtype=np.float32))
+    old = refresh_snapshot(db, path)
+    db.set_criminal_encoding("7", np.full(128, 0.9, dtype=np.float32))
+    db.add_criminal("Roe", 41, "Arson", "8", np.full(128, 0.2, dtype=np.float32))
+
+    new = refresh_snapshot(db, path)
+
+    assert old.ids == ["7"] and np.all(old.encodings[0] == np.float32(0.1))
+    assert new.ids == ["7", "8"]
+    assert np.all(new.encodings[0] == np.float32(0.9)) and np.all(new.encodings[1] == np.float32(0.2))
+
+
+def test_concurrent_refreshes_agree(db, tmp_path):
+    path = str(tmp_path / "watchlist.snapshot")
+    refresh_snapshot(db, path)
+    rows = [(None, None, None, str(i), np.full(128, i, dtype=np.float32)) for i in range(200)]
+    db.add_criminals_bulk(rows)
+
+    def refresh():
+        try:
+            return refresh_snapshot(db, path).ids
+        finally:
+            db.close_db_connection()
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: refresh(), range(8)))
+
+    snapshot = EncodingSnapshot(path)
+    assert all(ids == snapshot.ids for ids in results)
+    assert sorted(snapshot.ids, key=int) == [str(i) for i in range(200)]
+    for row, criminal_id in enumerate(snapshot.ids):
+        assert np.all(snapshot.encodings[row] == np.float32(criminal_id))
+
+
+def test_ivf_centroids_are_trained_once_per_snapshot(db, tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    db.add_criminals_bulk([(f"Person {i}", 30, "Fraud", str(i), rng.standard_normal(128).astype(np.float32))
+                           for i in range(4 * 39)])
+    path = str(tmp_path / "watchlist.snapshot")
+    first = FaceRecognizer(db, index="ivf", snapshot_path=path, nlist=4)
+    snapshot = EncodingSnapshot(path)
+    np.testing.assert_array_equal(load_centroids(path, snapshot.change_seq), first.index.centroids)
+
+    monkeypatch.setattr("watchlist_index.IVFIndex.train", lambda self, encodings: pytest.fail("retrained"))
+    second = FaceRecognizer(db, index="ivf", snapshot_path=path, nlist=4)
+
+    np.testing.assert_array_equal(second.index.centroids, first.index.centroids)
+    assert load_centroids(path, snapshot.change_seq + 1) is None
@@ -0,0 +1,76 @@
+# tests/test_face_tracking.py
+import numpy as np
+from face_tracking import EncodingCache, FaceTracker
+
+FRAME = np.random.default_rng(0).integers(0, 255, (240, 320, 3), dtype=np.uint8)
+
+
+class StubRecognizer:
+    def __init__(self):
+        self.identified = 0
+
+    def identify(self, encodings):
+        self.identified += len(encodings)
+        return [(f"C{int(encoding[0])}", 0.3) for encoding in encodings]
+
+
+class StubEmotionDetector:
+    emotion_labels = ["Neutral", "Happy"]
+
+
+class StubAnalyzer:
+    """One face at a fixed box; encode() hands out the given identities in turn"""
+
+    def __init__(self, identities):
+        self.face_recognizer = StubRecognizer()
+        self.emotion_detector = StubEmotionDetector()
+        self.identities = iter(identities)
+        self.encoded = 0
+        self.frame_times = []
+
+    def detect_faces(self, gray):
+        return [(100, 80, 60, 60)]
+
+    def encode(self, frame, boxes):
+        self.encoded += len(boxes)
+        return [np.full(128, next(self.identities), dtype=np.float32) for _ in boxes]
+
+    def classify(self, gray, boxes):
+        return [np.array([0.2, 0.8]) for _ in boxes]
+
+    def frame_done(self, seconds):
+        self.frame_times.append(seconds)
+
+
+def test_cache_hits_skip_encoding_matching_and_voting():
+    analyzer = StubAnalyzer([1])
+    tracker = FaceTracker(analyzer, detect_interval=1, encoding_cache=EncodingCache(ttl=60))
+
+    for _ in range(20):
+        faces = tracker.process(FRAME)
+
+    assert faces[0].identity == "C1"
+    assert analyzer.encoded == analyzer.face_recognizer.identified == 1
+    assert len(tracker.tracks[0].votes) == 1
+    assert tracker.metrics()["hits"] == 19
+
+
+def test_votes_come_from_fresh_encodings_only():
+    analyzer = StubAnalyzer([1, 1, 2, 2, 2])
+    tracker = FaceTracker(analyzer, detect_interval=1, vote_window=5, encoding_cache=EncodingCache(ttl=0))
+
+    labels = [tracker.process(FRAME)[0].identity for _ in range(5)]
+
+    # One outlier does not flip the label; a sustained change does
+    assert labels == ["C1", "C1", "C1", "C2", "C2"]
+    assert [vote[0] for vote in tracker.tracks[0].votes] == ["C1", "C1", "C2", "C2", "C2"]
+
+
+def test_only_detection_frames_feed_the_scale_tuner():
+    analyzer = StubAnalyzer([1])
+    tracker = FaceTracker(analyzer, detect_interval=5, encoding_cache=EncodingCache(ttl=60))
+
+    for _ in range(20):
+        tracker.process(FRAME)
+
+    assert len(analyzer.frame_times) == 4
@@ -0,0 +1,90 @@
+# tests/test_inference_scheduler.py
+import threading
+import numpy as np
+import pytest
+from inference_scheduler import BatchScheduler
+
+
+@pytest.fixture
+def scheduler():
+    schedulers = []
+
+    def make(infer_fn=lambda batch: batch * 2, **params):
+        schedulers.append(BatchScheduler(infer_fn, **params))
+        return schedulers[-1]
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.close()
+
+
+def test_full_batches_flush_without_waiting(scheduler):
+    batches = scheduler(max_batch_size=4, max_delay=60)
+
+    futures = batches.submit_many(np.arange(8, dtype=np.float32))
+
+    assert [future.result(timeout=5) for future in futures] == [2 * i for i in range(8)]
+    assert batches.stats()["batch_size_histogram"] == {4: 2}
+
+
+def test_partial_batch_flushes_after_max_delay(scheduler):
+    batches = scheduler(max_batch_size=32, max_delay=0.05)
+
+    futures = batches.submit_many(np.ones(3, dtype=np.float32))
+
+    assert [future.result(timeout=5) for future in futures] == [2, 2, 2]
+    assert batches.stats()["batch_size_histogram"] == {3: 1}
+
+
+def test_cancelled_input_is_skipped_and_the_worker_survives(scheduler):
+    release = threading.Event()
+
+    def blocking_infer(batch):
+        release.wait(5)
+        return batch + 1
+
+    batches = scheduler(blocking_infer, max_batch_size=1, max_delay=0)
+    first = batches.submit(np.float32(0))  # occupies the worker
+    cancelled = batches.submit(np.float32(1))
+    assert cancelled.cancel()
+    release.set()
+
+    assert first.result(timeout=5) == 1
+    assert batches.submit(np.float32(2)).result(timeout=5) == 3
+
+
+def test_short_output_fails_every_input_of_the_batch(scheduler):
+    batches = scheduler(lambda batch: batch[:1], max_batch_size=3, max_delay=60)
+
+    futures = batches.submit_many(np.zeros(3, dtype=np.float32))
+
+    for future in futures:
+        with pytest.raises(ValueError, match="1 rows for a batch of 3"):
+            future.result(timeout=5)
+
+
+def test_inference_errors_reach_the_callers(scheduler):
+    calls = []
+
+    def flaky_infer(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("model failed")
+        return batch
+
+    batches = scheduler(flaky_infer, max_batch_size=2, max_delay=60)
+    with pytest.raises(RuntimeError, match="model failed"):
+        batches.submit_many(np.zeros(2, dtype=np.float32))[0].result(timeout=5)
+
+    assert batches.submit_many(np.ones(2, dtype=np.float32))[1].result(timeout=5) == 1
+
+
+def test_close_flushes_queued_inputs(scheduler):
+    batches = scheduler(max_batch_size=32, max_delay=60)
+    futures = batches.submit_many(np.ones(5, dtype=np.float32))
+
+    batches.close()
+
+    assert [future.result(timeout=0) for future in futures] == [2] * 5
+    with pytest.raises(RuntimeError):
+        batches.submit(np.float32(1))
@@ -0,0 +1,99 @@
+# tests/test_instrumentation.py
+import json
+import pytest
+import instrumentation
+
+
+@pytest.fixture(autouse=True)
+def clean(monkeypatch):
+    """Enabled instrumentation with no samples, counters or exporter"""
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    instrumentation.stop_export()
+    instrumentation.reset()
+    yield
+    instrumentation.stop_export()
+    instrumentation.reset()
+
+
+def test_percentiles_use_nearest_rank():
+    values = list(range(100, 0, -1))  # order must not matter
+
+    assert instrumentation.percentiles(values) == {50: 51, 95: 96, 99: 100}
+    assert instrumentation.percentiles([7], (50, 99)) == {50: 7, 99: 7}
+    assert instrumentation.percentiles([]) == {}
+
+
+def test_snapshot_reports_milliseconds_and_counters():
+    for seconds in (0.001, 0.002, 0.003, 0.004):
+        instrumentation.record("detection", seconds)
+    instrumentation.count("frames")
+    instrumentation.count("frames", 2)
+
+    data = instrumentation.snapshot()
+
+    stats = data["stages"]["detection"]
+    assert stats["count"] == 4
+    assert stats["mean_ms"] == pytest.approx(2.5)
+    assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]) == pytest.approx((3.0, 4.0, 4.0))
+    assert data["counters"] == {"frames": 3}
+
+
+def test_snapshot_keeps_only_the_recent_window(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_window", 10)
+    for i in range(25):
+        instrumentation.record("encoding", 1.0 if i < 15 else 0.001)
+
+    stats = instrumentation.snapshot()["stages"]["encoding"]
+
+    assert stats["count"] == 25  # lifetime count, percentiles over the last 10
+    assert stats["p99_ms"] == pytest.approx(1.0)
+
+
+def test_timer_records_its_block():
+    with instrumentation.timer("db_write"):
+        pass
+
+    assert instrumentation.snapshot()["stages"]["db_write"]["count"] == 1
+
+
+def test_disabled_timer_and_counter_are_no_ops(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", False)
+    with instrumentation.timer("detection"):
+        pass
+    instrumentation.count("frames")
+
+    assert instrumentation.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_exporter_writes_rotating_json_lines(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    instrumentation.record("detection", 0.002)
+    instrumentation.count("frames", 5)
+    instrumentation.start_export(str(path), interval=3600, max_bytes=400, backups=2)
+    exporter = instrumentation._exporter
+
+    for _ in range(20):
+        exporter.write()
+    instrumentation.stop_export()
+
+    files = sorted(tmp_path.iterdir())
+    assert [file.name for file in files] == ["metrics.jsonl", "metrics.jsonl.1", "metrics.jsonl.2"]
+    for file in files:
+        assert file.stat().st_size <= 400
+        for line in file.read_text().splitlines():
+            data = json.loads(line)
+            assert data["stages"]["detection"]["count"] == 1
+            assert data["counters"] == {"frames": 5}
+            assert {"time", "pid"} <= data.keys()
+
+
+def test_exporter_skips_empty_snapshots_and_starts_once(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    instrumentation.start_export(str(path), interval=3600)
+    exporter = instrumentation._exporter
+    instrumentation.start_export(str(tmp_path / "other.jsonl"), interval=3600)
+
+    assert instrumentation._exporter is exporter
+    instrumentation.stop_export()
+    assert path.read_text() == ""
+    assert not (tmp_path / "other.jsonl").exists()
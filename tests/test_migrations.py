@@ -0,0 +1,63 @@
+# tests/test_migrations.py
+import sqlite3
+import time
+import pytest
+
+
+@pytest.fixture
+def local_time(monkeypatch):
+    """Run in a timezone with DST so the local-to-UTC conversion is exercised"""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def make_v0_database(path, logs):
+    """A database as the original init_db/log_emotion left it: text local-time timestamps"""
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE criminals (id INTEGER PRIMARY KEY, name TEXT, age INTEGER, crime TEXT,
+                 criminal_id TEXT UNIQUE, emotions TEXT)""")
+    conn.execute("""CREATE TABLE emotion_logs (id INTEGER PRIMARY KEY, criminal_id TEXT, timestamp TEXT,
+                 emotion TEXT, FOREIGN KEY (criminal_id) REFERENCES criminals(criminal_id))""")
+    conn.execute("INSERT INTO criminals (name, age, crime, criminal_id) VALUES ('Doe', 30, 'Fraud', 'C1')")
+    conn.executemany("INSERT INTO emotion_logs (criminal_id, timestamp, emotion) VALUES ('C1', ?, ?)", logs)
+    conn.commit()
+    conn.close()
+
+
+def test_v0_text_timestamps_become_epoch_ms(tmp_path, monkeypatch, local_time):
+    import database
+    logs = [("2024-01-15 09:30:00", "Happy"), ("2024-07-04 18:05:59", "Sad"), ("2024-07-04 18:06:00", "Happy")]
+    path = str(tmp_path / "v0.db")
+    make_v0_database(path, logs)
+    database.close_emotion_log_writer()
+    database.close_db_connection()
+    monkeypatch.setattr(database, "DB_PATH", path)
+    try:
+        database.init_db()
+
+        assert database.get_schema_version() == len(database.MIGRATIONS)
+        expected = [(int(time.mktime(time.strptime(text, "%Y-%m-%d %H:%M:%S"))) * 1000, emotion)
+                    for text, emotion in logs]
+        assert database.get_emotion_logs("C1") == expected
+        # Winter and summer rows are 5 and 4 hours behind UTC
+        assert expected[0][0] == 1705329000000 and expected[1][0] == 1720130759000
+        indexes = database.get_db_connection().execute("PRAGMA index_list(emotion_logs)").fetchall()
+        columns = [row[2] for row in database.get_db_connection().execute(
+            "PRAGMA index_info(idx_emotion_logs_criminal_time)")]
+        assert "idx_emotion_logs_criminal_time" in [row[1] for row in indexes]
+        assert columns == ["criminal_id", "timestamp"]
+        assert database.get_emotion_counts("C1") == {"Happy": 2, "Sad": 1}
+    finally:
+        database.close_emotion_log_writer()
+        database.close_db_connection()
+
+
+def test_migrating_twice_changes_nothing(db):
+    version = db.get_schema_version()
+
+    db.init_db()
+
+    assert db.get_schema_version() == version == len(db.MIGRATIONS)
@@ -0,0 +1,95 @@
+# tests/test_recognition_service.py
+import asyncio
+import os
+import socket
+import threading
+import time
+import numpy as np
+import pytest
+from frame_analysis import FaceAnalysis
+from recognition_service import RecognitionClient, RecognitionService
+
+
+class StubAnalyzer:
+    scheduler = None
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def analyze(self, frame):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return [FaceAnalysis("7", 0.3, "Happy", np.ones(7) / 7, (1, 2, 3, 4))]
+
+
+@pytest.fixture
+def serve(tmp_path):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def start(analyzer):
+        path = str(tmp_path / "service.sock")
+        asyncio.run_coroutine_threadsafe(RecognitionService(analyzer).serve(unix_path=path), loop)
+        deadline = time.monotonic() + 5
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return path
+
+    yield start
+
+    async def shutdown():
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+FRAME = np.zeros((32, 32, 3), dtype=np.uint8)
+
+
+def test_analyze_round_trip(serve):
+    client = RecognitionClient(f"unix://{serve(StubAnalyzer())}")
+
+    faces = client.analyze(FRAME)
+
+    assert [(face.identity, face.emotion, face.box) for face in faces] == [("7", "Happy", (1, 2, 3, 4))]
+
+
+def test_analyzer_error_is_a_500_and_not_retried(serve):
+    analyzer = StubAnalyzer(RuntimeError("model exploded"))
+    client = RecognitionClient(f"unix://{serve(analyzer)}")
+
+    with pytest.raises(RuntimeError, match="error 500"):
+        client.analyze(FRAME)
+
+    assert analyzer.calls == 1
+    assert client.health()["served"] == 0  # the connection survived
+
+
+def raw_request(path, request):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(path)
+        sock.sendall(request)
+        return sock.recv(1024)
+
+
+def test_malformed_request_line_gets_400(serve):
+    assert raw_request(serve(StubAnalyzer()), b"garbage\r\n\r\n").startswith(b"HTTP/1.1 400")
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-5"])
+def test_invalid_content_length_gets_400(serve, length):
+    request = b"POST /analyze HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n"
+
+    response = raw_request(serve(StubAnalyzer()), request)
+
+    assert response.startswith(b"HTTP/1.1 400") and b"invalid Content-Length" in response
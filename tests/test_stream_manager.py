@@ -0,0 +1,72 @@
+import time
+
+import cv2
+import numpy as np
+
+from stream_manager import StreamManager
+
+
+def write_video(path, frames=60, fps=30):
+    """Uniform grey frames whose brightness encodes the frame number"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for i in range(frames):
+        writer.write(np.full((48, 64, 3), 4 * i, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+class SlowProcessor:
+    """Records which frames it saw and takes longer than the feeds' frame interval"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.frames = []
+
+    def __call__(self, frame):
+        self.frames.append(int(round(frame.mean() / 4)))
+        time.sleep(self.seconds)
+        return []
+
+
+def run_until_finished(manager, timeout=10):
+    manager.start()
+    deadline = time.monotonic() + timeout
+    try:
+        while not manager.finished() and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        manager.stop()
+    assert manager.finished()
+
+
+def test_overloaded_cameras_share_the_worker_and_drop_oldest(tmp_path):
+    # Two 30 fps feeds into one worker that manages about 25 frames a second in total
+    processors = {}
+    manager = StreamManager(workers=1)
+    for camera_id in ("a", "b"):
+        processors[camera_id] = SlowProcessor(0.04)
+        manager.add_camera(camera_id, write_video(tmp_path / f"{camera_id}.avi"), processors[camera_id])
+
+    run_until_finished(manager)
+
+    metrics = manager.metrics()
+    seen = {camera_id: processor.frames for camera_id, processor in processors.items()}
+    assert all(metrics[camera_id]["dropped_frames"] > 0 for camera_id in seen)
+    counts = sorted(len(frames) for frames in seen.values())
+    assert counts[0] >= 10 and counts[1] - counts[0] <= 0.2 * counts[1]
+    for frames in seen.values():
+        # Frames come out in order with gaps, and the newest frames are not the ones dropped
+        assert frames == sorted(frames) and len(frames) < 60
+        assert frames[-1] >= 50
+
+
+def test_frame_budget_limits_processing_rate(tmp_path):
+    processor = SlowProcessor(0)
+    manager = StreamManager(workers=2)
+    camera = manager.add_camera("a", write_video(tmp_path / "a.avi"), processor, max_fps=10)
+
+    run_until_finished(manager)
+
+    # 60 frames at 30 fps take 2 s, of which about 20 fit a 10 fps budget
+    assert 12 <= len(processor.frames) <= 25
+    assert camera.frame_queue.dropped > 0
@@ -0,0 +1,37 @@
+import threading
+
+import numpy as np
+
+from video_pipeline import VideoPipeline
+
+
+class BlockingCapture:
+    """Capture whose read() hangs until unblocked, like a stalled camera"""
+
+    def __init__(self):
+        self.unblock = threading.Event()
+        self.reading = threading.Event()
+        self.released_by = None
+
+    def read(self):
+        self.reading.set()
+        self.unblock.wait()
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released_by = threading.current_thread()
+
+
+def test_capture_is_released_by_the_capture_thread_after_read_returns(monkeypatch):
+    capture = BlockingCapture()
+    pipeline = VideoPipeline(capture, lambda frame: []).start()
+    assert capture.reading.wait(2)
+    capture_thread = pipeline.threads[0]
+    monkeypatch.setattr(capture_thread, "join", lambda timeout=None: None)  # join gives up, as on a stuck device
+
+    pipeline.stop()
+    assert capture_thread.is_alive() and capture.released_by is None
+
+    capture.unblock.set()
+    threading.Thread.join(capture_thread, 2)
+    assert capture.released_by is capture_thread
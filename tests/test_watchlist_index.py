@@ -0,0 +1,86 @@
+# tests/test_watchlist_index.py
+import threading
+import numpy as np
+import pytest
+from watchlist_index import ENCODING_DIM, BruteForceIndex, IVFIndex, create_index, recall_at_k
+
+
+def make_watchlist(size, seed=0):
+    rng = np.random.default_rng(seed)
+    encodings = rng.standard_normal((size, ENCODING_DIM), dtype=np.float32) / np.sqrt(ENCODING_DIM)
+    return [f"C{i:06d}" for i in range(size)], encodings
+
+
+def test_ivf_recall_against_exact_search():
+    ids, encodings = make_watchlist(50_000)
+    exact = BruteForceIndex(ids, encodings)
+    ivf = IVFIndex(nlist=256, nprobe=16)
+    ivf.build(ids, encodings)
+    assert ivf.is_trained and len(ivf) == len(exact)
+
+    # Probe photos are noisy views of enrolled faces
+    rng = np.random.default_rng(1)
+    queries = encodings[rng.choice(len(ids), 500, replace=False)]
+    queries = queries + rng.standard_normal(queries.shape, dtype=np.float32) * 0.3 / np.sqrt(ENCODING_DIM)
+
+    assert recall_at_k(ivf, exact, queries, k=1) >= 0.95
+
+
+@pytest.mark.parametrize("kind", ["exact", "ivf"])
+def test_search_during_updates_never_mismatches_ids(kind):
+    ids, encodings = make_watchlist(2000)
+    index = create_index(kind, **({"nlist": 16, "nprobe": 16} if kind == "ivf" else {}))
+    index.build(ids, encodings)
+    extra_ids, extra_encodings = make_watchlist(50, seed=1)
+    stop = threading.Event()
+
+    def churn():
+        while not stop.is_set():
+            for criminal_id, encoding in zip(extra_ids, extra_encodings):
+                index.add("X" + criminal_id, encoding)
+            for criminal_id in extra_ids:
+                index.remove("X" + criminal_id)
+
+    writer = threading.Thread(target=churn)
+    writer.start()
+    try:
+        rows = np.arange(0, len(ids), 20)
+        for _ in range(50):
+            found, distances = index.search(encodings[rows], k=1)
+            assert list(found[:, 0]) == [ids[row] for row in rows]
+            assert np.all(distances[:, 0] < 0.01)
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_build_reuses_given_centroids(monkeypatch):
+    ids, encodings = make_watchlist(4 * 39)
+    trained = IVFIndex(nlist=4)
+    trained.build(ids, encodings)
+    index = IVFIndex(nlist=4)
+    monkeypatch.setattr(index, "train", lambda encodings: pytest.fail("retrained"))
+
+    index.build(ids, encodings, trained.centroids)
+
+    assert index.centroids is trained.centroids
+    assert list(index.search(encodings[:5])[0][:, 0]) == ids[:5]
+
+
+def test_add_trains_outside_the_write_lock():
+    ids, encodings = make_watchlist(4 * 39)
+    index = IVFIndex(nlist=4)
+    train = index.train
+    searched = []
+
+    def checked_train(sample):
+        assert not index._write_lock.locked()
+        searched.append(index.search(encodings[:1])[0][0, 0])
+        return train(sample)
+
+    index.train = checked_train
+    for criminal_id, encoding in zip(ids, encodings):
+        index.add(criminal_id, encoding)
+
+    assert index.is_trained and len(index) == len(ids) and searched == [ids[0]]
+    assert list(index.search(encodings)[0][:, 0]) == ids
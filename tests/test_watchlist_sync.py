@@ -0,0 +1,31 @@
+# tests/test_watchlist_sync.py
+import sqlite3
+import numpy as np
+import pytest
+from face_recognition_module import FaceRecognizer
+
+
+def external_write(db, sql, params):
+    """Change the criminals table the way another process would, bypassing listeners"""
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize("snapshot", [False, True])
+def test_sync_picks_up_changes_from_other_processes(db, tmp_path, snapshot):
+    recognizer = FaceRecognizer(db, snapshot_path=str(tmp_path / "w.snapshot") if snapshot else None)
+    encoding = np.full(128, 0.3, dtype=np.float32)
+    assert not recognizer.sync_watchlist()
+
+    external_write(db, "INSERT INTO criminals (name, age, crime, criminal_id, encoding) VALUES (?, ?, ?, ?, ?)",
+                   ("Doe", 30, "Fraud", "7", encoding.tobytes()))
+    assert recognizer.identify([encoding])[0][0] == "Unknown"
+    assert recognizer.sync_watchlist()
+    assert recognizer.identify([encoding])[0][0] == "7"
+
+    external_write(db, "DELETE FROM criminals WHERE criminal_id = ?", ("7",))
+    assert recognizer.sync_watchlist()
+    assert recognizer.identify([encoding])[0][0] == "Unknown"
+    assert not recognizer.sync_watchlist()
@@ -0,0 +1,156 @@
+# video_pipeline.py
+import threading
+import time
+from collections import deque
+
+
+class DropOldestQueue:
+    """Bounded queue that discards its oldest item instead of blocking producers"""
+
+    def __init__(self, maxsize=2):
+        self.items = deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest item, or None if nothing arrived within timeout"""
+        with self.condition:
+            if not self.items:
+                self.condition.wait(timeout)
+            return self.items.popleft() if self.items else None
+
+    def __len__(self):
+        with self.condition:
+            return len(self.items)
+
+
+class StageStats:
+    """Rolling per-stage latencies and event rates"""
+
+    def __init__(self, window=120):
+        self.window = window
+        self.latencies = {}  # stage: deque of seconds
+        self.events = {}  # counter: deque of timestamps
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.latencies.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    def tick(self, counter):
+        with self.lock:
+            self.events.setdefault(counter, deque(maxlen=self.window)).append(time.monotonic())
+
+    def rate(self, counter):
+        """Events per second over the rolling window"""
+        with self.lock:
+            stamps = self.events.get(counter)
+            if not stamps or len(stamps) < 2 or stamps[-1] == stamps[0]:
+                return 0.0
+            return (len(stamps) - 1) / (stamps[-1] - stamps[0])
+
+    def snapshot(self):
+        """Mean latency in milliseconds per stage and rate per counter"""
+        with self.lock:
+            latencies = {stage: 1000.0 * sum(values) / len(values)
+                         for stage, values in self.latencies.items() if values}
+            counters = list(self.events)
+        return {"latency_ms": latencies, "fps": {counter: self.rate(counter) for counter in counters}}
+
+
+class VideoPipeline:
+    """Capture thread -> inference workers -> newest-result hand-off to the UI
+
+    Frames flow through bounded drop-oldest queues, so a slow stage never
+    blocks the one before it: the UI always gets the newest captured frame
+    and the most recent inference result, which may lag a few frames.
+    process_fn is called from the worker threads; keep workers=1 for
+    stateful processors such as FaceTracker. The pipeline owns the capture:
+    the capture thread releases it once stopped, never while read() is
+    still running, so callers must not release it themselves.
+    """
+
+    def __init__(self, capture, process_fn, workers=1, queue_size=2):
+        self.capture = capture
+        self.process_fn = process_fn
+        self.frame_queue = DropOldestQueue(queue_size)
+        self.stats = StageStats()
+        self.lock = threading.Lock()
+        self.latest_frame_item = None  # (seq, frame)
+        self.latest_result_item = None  # (seq, result)
+        self.running = False
+        self.threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True)]
+        self.threads += [threading.Thread(target=self._inference_loop, name=f"inference-{i}", daemon=True)
+                         for i in range(workers)]
+
+    def start(self):
+        self.running = True
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=2)
+
+    def latest_frame(self):
+        """Newest captured frame, or None before the first one"""
+        with self.lock:
+            return self.latest_frame_item[1] if self.latest_frame_item else None
+
+    def latest_result(self):
+        """Newest inference result, or None before the first one"""
+        with self.lock:
+            return self.latest_result_item[1] if self.latest_result_item else None
+
+    def metrics(self):
+        """FPS, per-stage latency and dropped frame counts"""
+        metrics = self.stats.snapshot()
+        metrics["dropped_frames"] = self.frame_queue.dropped
+        return metrics
+
+    def _capture_loop(self):
+        seq = 0
+        try:
+            while self.running:
+                start = time.perf_counter()
+                ret, frame = self.capture.read()
+                if not ret:
+                    time.sleep(0.01)
+                    continue
+                seq += 1
+                self.stats.record("capture", time.perf_counter() - start)
+                self.stats.tick("capture")
+                with self.lock:
+                    self.latest_frame_item = (seq, frame)
+                self.frame_queue.put((seq, frame))
+        finally:
+            # A device can block in read() past stop()'s join timeout; release only after it returns
+            self.capture.release()
+
+    def _inference_loop(self):
+        while self.running:
+            item = self.frame_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            seq, frame = item
+            start = time.perf_counter()
+            try:
+                result = self.process_fn(frame)
+            except Exception as e:
+                print(f"Frame processing failed: {e}")
+                continue
+            self.stats.record("inference", time.perf_counter() - start)
+            self.stats.tick("inference")
+            with self.lock:
+                # Workers may finish out of order; never replace a newer result
+                if self.latest_result_item is None or seq > self.latest_result_item[0]:
+                    self.latest_result_item = (seq, result)
@@ -0,0 +1,295 @@
+# watchlist_index.py
+import threading
+import numpy as np
+
+ENCODING_DIM = 128
+
+
+class BruteForceIndex:
+    """Exact nearest-neighbour search over a contiguous watchlist matrix
+
+    The (ids, encodings, sq_norms) arrays live in one tuple that writers
+    replace whole, so a concurrent search always sees a consistent watchlist.
+    """
+
+    def __init__(self, ids=None, encodings=None):
+        self._write_lock = threading.Lock()
+        self._state = (np.empty(0, dtype=object), np.empty((0, ENCODING_DIM), dtype=np.float32),
+                       np.empty(0, dtype=np.float32))
+        if ids is not None and encodings is not None:
+            self.build(ids, encodings)
+
+    def __len__(self):
+        return len(self._state[0])
+
+    @property
+    def ids(self):
+        return self._state[0]
+
+    @property
+    def encodings(self):
+        return self._state[1]
+
+    def build(self, ids, encodings):
+        """Replace the watchlist with the given IDs and (N x 128) encodings"""
+        ids = np.asarray(ids, dtype=object)
+        encodings = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        with self._write_lock:
+            self._state = (ids, encodings, np.einsum('ij,ij->i', encodings, encodings))
+
+    def add(self, criminal_id, encoding):
+        """Add (or replace) a single encoding"""
+        encoding = np.asarray(encoding, dtype=np.float32).reshape(1, ENCODING_DIM)
+        with self._write_lock:
+            ids, encodings, sq_norms = self._state
+            keep = ids != criminal_id
+            self._state = (np.append(ids[keep], np.array([criminal_id], dtype=object)),
+                           np.vstack([encodings[keep], encoding]),
+                           np.append(sq_norms[keep], np.dot(encoding[0], encoding[0])))
+
+    def remove(self, criminal_id):
+        """Remove an encoding by ID, returns True if it was present"""
+        with self._write_lock:
+            ids, encodings, sq_norms = self._state
+            keep = ids != criminal_id
+            if keep.all():
+                return False
+            self._state = (ids[keep], encodings[keep], sq_norms[keep])
+            return True
+
+    def search(self, queries, k=1):
+        """Return (ids, distances) of the k nearest encodings for each query row"""
+        ids, encodings, sq_norms = self._state
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        k = min(k, len(ids))
+        if k == 0 or len(queries) == 0:
+            return (np.empty((len(queries), 0), dtype=object),
+                    np.empty((len(queries), 0), dtype=np.float32))
+
+        # ||q - e||^2 = ||q||^2 + ||e||^2 - 2 q.e, computed for all pairs at once
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        sq_dists = q_norms[:, None] + sq_norms[None, :] - 2.0 * (queries @ encodings.T)
+        np.maximum(sq_dists, 0, out=sq_dists)
+
+        if k < sq_dists.shape[1]:
+            top = np.argpartition(sq_dists, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(k), (len(queries), k))
+        top_dists = np.take_along_axis(sq_dists, top, axis=1)
+        order = np.argsort(top_dists, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_dists = np.sqrt(np.take_along_axis(top_dists, order, axis=1))
+        return ids[top], top_dists
+
+
+class IVFIndex:
+    """Approximate search using an inverted-file (IVF) partition of the watchlist
+    
+    Encodings are clustered into ``nlist`` cells with k-means and only the
+    ``nprobe`` cells closest to each query are scanned, so raising nprobe
+    trades latency for recall. Until enough encodings exist to train the
+    cells, every search falls back to an exact scan. As in BruteForceIndex,
+    searches read one immutable (centroids, cell lists, count) tuple that
+    writers replace whole; training happens outside the write lock.
+    """
+
+    def __init__(self, nlist=1024, nprobe=16, train_iterations=10, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.seed = seed
+        self._write_lock = threading.Lock()
+        # (centroids, list_ids, list_encodings, list_sq_norms, count), cell lists are tuples
+        self._state = (None, (), (), (), 0)
+        self.id_to_list = {}  # criminal_id: cell number, only touched under the write lock
+        self._training = False  # an add() is training the cells outside the lock
+
+    def __len__(self):
+        return self._state[4]
+
+    @property
+    def centroids(self):
+        return self._state[0]
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def build(self, ids, encodings, centroids=None):
+        """Replace the watchlist, training the cells on the given encodings unless centroids are given"""
+        encodings = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if centroids is not None and np.shape(centroids) != (self.nlist, ENCODING_DIM):
+            centroids = None  # trained for a different nlist
+        if centroids is None and len(encodings) >= self.nlist * 39:  # enough points per cell for k-means
+            centroids = self.train(encodings)
+        state, id_to_list = self._layout(centroids, np.asarray(ids, dtype=object), encodings)
+        with self._write_lock:
+            self._state, self.id_to_list = state, id_to_list
+
+    def train(self, encodings):
+        """Run k-means over (a sample of) the encodings and return the cell centroids"""
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(encodings), self.nlist * 256)
+        sample = encodings[rng.choice(len(encodings), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, self.nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assignment = _nearest_centroids(sample, centroids, 1)[:, 0]
+            # One weighted bincount per dimension; np.add.at is an order of magnitude slower
+            sums = np.stack([np.bincount(assignment, weights=sample[:, d], minlength=self.nlist)
+                             for d in range(sample.shape[1])], axis=1)
+            counts = np.bincount(assignment, minlength=self.nlist)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        return centroids
+
+    def _layout(self, centroids, ids, encodings):
+        """(state, id_to_list) with the encodings distributed into their cells"""
+        n_lists = self.nlist if centroids is not None else 1
+        if centroids is not None and len(encodings):
+            cells = _nearest_centroids(encodings, centroids, 1)[:, 0]
+        else:
+            cells = np.zeros(len(encodings), dtype=np.intp)
+        order = np.argsort(cells, kind='stable')
+        bounds = np.searchsorted(cells[order], np.arange(n_lists + 1))
+        list_ids, list_encodings, list_sq_norms = [], [], []
+        for cell in range(n_lists):
+            members = order[bounds[cell]:bounds[cell + 1]]
+            list_ids.append(ids[members])
+            list_encodings.append(encodings[members])
+            list_sq_norms.append(np.einsum('ij,ij->i', encodings[members], encodings[members]))
+        id_to_list = {criminal_id: int(cell) for criminal_id, cell in zip(ids, cells)}
+        return (centroids, tuple(list_ids), tuple(list_encodings), tuple(list_sq_norms), len(ids)), id_to_list
+
+    def add(self, criminal_id, encoding):
+        """Insert (or replace) a single encoding into its nearest cell"""
+        encoding = np.asarray(encoding, dtype=np.float32).reshape(1, ENCODING_DIM)
+        with self._write_lock:
+            self._remove(criminal_id)
+            centroids, list_ids, list_encodings, list_sq_norms, count = self._state
+            if not list_ids:
+                list_ids = (np.empty(0, dtype=object),)
+                list_encodings = (np.empty((0, ENCODING_DIM), dtype=np.float32),)
+                list_sq_norms = (np.empty(0, dtype=np.float32),)
+            cell = int(_nearest_centroids(encoding, centroids, 1)[0, 0]) if centroids is not None else 0
+            list_ids, list_encodings, list_sq_norms = list(list_ids), list(list_encodings), list(list_sq_norms)
+            list_ids[cell] = np.append(list_ids[cell], np.array([criminal_id], dtype=object))
+            list_encodings[cell] = np.vstack([list_encodings[cell], encoding])
+            list_sq_norms[cell] = np.append(list_sq_norms[cell], np.dot(encoding[0], encoding[0]))
+            self.id_to_list[criminal_id] = cell
+            self._state = (centroids, tuple(list_ids), tuple(list_encodings), tuple(list_sq_norms), count + 1)
+            train = centroids is None and count + 1 >= self.nlist * 39 and not self._training
+            if train:
+                self._training = True
+        if train:
+            self._train_and_swap()
+
+    def _train_and_swap(self):
+        """Train the cells outside the write lock, then swap the trained layout in"""
+        try:
+            centroids = self.train(self._state[2][0])
+            while True:
+                state = self._state
+                if state[0] is not None:  # build() installed a trained layout meanwhile
+                    return
+                ids = state[1][0] if state[1] else np.empty(0, dtype=object)
+                encodings = state[2][0] if state[2] else np.empty((0, ENCODING_DIM), dtype=np.float32)
+                trained, id_to_list = self._layout(centroids, ids, encodings)
+                with self._write_lock:
+                    if self._state is state:  # otherwise redo the layout with the newer lists
+                        self._state, self.id_to_list = trained, id_to_list
+                        return
+        finally:
+            self._training = False
+
+    def remove(self, criminal_id):
+        """Remove an encoding by ID, returns True if it was present"""
+        with self._write_lock:
+            return self._remove(criminal_id)
+
+    def _remove(self, criminal_id):
+        cell = self.id_to_list.pop(criminal_id, None)
+        if cell is None:
+            return False
+        centroids, list_ids, list_encodings, list_sq_norms, count = self._state
+        keep = list_ids[cell] != criminal_id
+        list_ids, list_encodings, list_sq_norms = list(list_ids), list(list_encodings), list(list_sq_norms)
+        list_ids[cell] = list_ids[cell][keep]
+        list_encodings[cell] = list_encodings[cell][keep]
+        list_sq_norms[cell] = list_sq_norms[cell][keep]
+        self._state = (centroids, tuple(list_ids), tuple(list_encodings), tuple(list_sq_norms), count - 1)
+        return True
+
+    def search(self, queries, k=1):
+        """Return (ids, distances) of the approximate k nearest encodings per query"""
+        centroids, list_ids, list_encodings, list_sq_norms, count = self._state
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        k = min(k, count)
+        result_ids = np.full((len(queries), k), None, dtype=object)
+        result_dists = np.full((len(queries), k), np.inf, dtype=np.float32)
+        if k == 0:
+            return result_ids, result_dists
+
+        if centroids is not None:
+            probes = _nearest_centroids(queries, centroids, min(self.nprobe, self.nlist))
+        else:
+            probes = np.zeros((len(queries), 1), dtype=np.intp)
+
+        for row, (query, cells) in enumerate(zip(queries, probes)):
+            # Score each probed cell in place rather than copying them together
+            query_sq_norm = np.dot(query, query)
+            sq_dists = np.concatenate([
+                list_sq_norms[cell] - 2.0 * (list_encodings[cell] @ query) + query_sq_norm
+                for cell in cells])
+            if len(sq_dists) == 0:
+                continue
+            candidate_ids = np.concatenate([list_ids[cell] for cell in cells])
+            np.maximum(sq_dists, 0, out=sq_dists)
+            if k < len(sq_dists):
+                top = np.argpartition(sq_dists, k - 1)[:k]
+                top = top[np.argsort(sq_dists[top])]
+            else:
+                top = np.argsort(sq_dists)
+            result_ids[row, :len(top)] = candidate_ids[top]
+            result_dists[row, :len(top)] = np.sqrt(sq_dists[top])
+        return result_ids, result_dists
+
+
+def _nearest_centroids(points, centroids, count, chunk_size=16384):
+    """Indices of the ``count`` nearest centroids for every point
+
+    Points are processed in chunks so assigning a large watchlist never
+    materialises the full (N x nlist) distance matrix.
+    """
+    centroid_sq_norms = np.einsum('ij,ij->i', centroids, centroids)
+    count = min(count, centroids.shape[0])
+    result = np.empty((len(points), count), dtype=np.intp)
+    for start in range(0, len(points), chunk_size):
+        sq_dists = points[start:start + chunk_size] @ centroids.T
+        sq_dists *= -2.0
+        sq_dists += centroid_sq_norms
+        if count == 1:  # assignment, the common case while training
+            nearest = sq_dists.argmin(axis=1)[:, None]
+        elif count == centroids.shape[0]:
+            nearest = np.argsort(sq_dists, axis=1)
+        else:
+            nearest = np.argpartition(sq_dists, count - 1, axis=1)[:, :count]
+            order = np.argsort(np.take_along_axis(sq_dists, nearest, axis=1), axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+        result[start:start + chunk_size] = nearest
+    return result
+
+
+def create_index(kind="exact", **params):
+    """Create a watchlist index backend by name ('exact' or 'ivf')"""
+    backends = {"exact": BruteForceIndex, "ivf": IVFIndex}
+    if kind not in backends:
+        raise ValueError(f"Unknown watchlist index '{kind}', expected one of {sorted(backends)}")
+    return backends[kind](**params)
+
+
+def recall_at_k(index, exact_index, queries, k=1):
+    """Fraction of the exact top-k neighbours that ``index`` also returns"""
+    approx_ids, _ = index.search(queries, k)
+    exact_ids, _ = exact_index.search(queries, k)
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approx_ids, exact_ids))
+    return hits / max(exact_ids.size, 1)